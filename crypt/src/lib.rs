@@ -39,6 +39,7 @@ use shared::ALGORITHMS;
 
 mod aes_256_gcm;
 mod aes_256_gcm_siv;
+mod password;
 
 /// Return the module name.
 #[wasm_bindgen]
@@ -85,6 +86,26 @@ pub fn header_suffix(algorithm: String) -> String {
     shared::header_suffix(algorithm)
 }
 
+/// Return the algorithm used to encrypt a string.
+///
+/// The algorithm is identified by the header prefix on the first line.
+///
+/// # Arguments
+/// * `ciphertext`: The encrypted, mime encoded plaintext.
+///
+/// # Returns
+/// The algorithm identifier.
+#[wasm_bindgen]
+pub fn get_algorithm_from_header(ciphertext: String) -> String {
+    let first = ciphertext.trim_start().lines().next().unwrap_or("");
+    for algorithm in ALGORITHMS {
+        if first == shared::header_prefix(algorithm.to_string()) {
+            return algorithm.to_string();
+        }
+    }
+    "error:header:unknown-algorithm".to_string()
+}
+
 /// Encrypts a string coming from Javascript using the specified algorithm.
 ///
 /// It accepts a plaintext string and converts it a MIME encoded block
@@ -137,13 +158,61 @@ pub fn decrypt(algorithm: String, password: String, ciphertext: String) -> Strin
     format!("error:decrypt:not-implemented:{}", algorithm)
 }
 
+/// Generate a cryptic password.
+///
+/// # Arguments
+/// * `alphabet`: The characters to choose from.
+/// * `minlen`: The minimum password length.
+/// * `maxlen`: The maximum password length.
+/// * `required`: The required character classes separated by newlines, can be empty.
+///
+/// # Returns
+/// The password.
+#[wasm_bindgen]
+pub fn generate_password(
+    alphabet: String,
+    minlen: usize,
+    maxlen: usize,
+    required: String,
+) -> String {
+    password::generate(alphabet, minlen, maxlen, required, 1)
+}
+
+/// Generate a batch of cryptic passwords in one call.
+///
+/// This avoids crossing the javascript/wasm boundary for each password
+/// when many passwords are rotated at once.
+///
+/// # Arguments
+/// * `alphabet`: The characters to choose from.
+/// * `minlen`: The minimum password length.
+/// * `maxlen`: The maximum password length.
+/// * `required`: The required character classes separated by newlines, can be empty.
+/// * `count`: The number of passwords to generate.
+///
+/// # Returns
+/// The passwords separated by newlines.
+#[wasm_bindgen]
+pub fn generate_passwords(
+    alphabet: String,
+    minlen: usize,
+    maxlen: usize,
+    required: String,
+    count: usize,
+) -> String {
+    password::generate(alphabet, minlen, maxlen, required, count)
+}
+
 #[cfg(test)]
 mod tests {
     use wasm_bindgen_test::*;
     extern crate wasm_bindgen;
     use crate::decrypt;
     use crate::encrypt;
+    use crate::generate_password;
+    use crate::generate_passwords;
     use crate::get_algorithm;
+    use crate::get_algorithm_from_header;
     use crate::get_num_algorithms;
     use crate::header_prefix;
 
@@ -248,4 +317,55 @@ mod tests {
         assert_eq!(&plaintext, &testtext);
         println!("test04: done");
     }
+
+    #[wasm_bindgen_test]
+    pub fn test05() {
+        // Verify that the algorithm is found from the header.
+        println!("test05: start");
+        let password = "secret";
+        let plaintext = "Lorem ipsum dolor sit amet.";
+        for algorithm in &["crypt-aes-256-gcm", "crypt-aes-256-gcm-siv"] {
+            let ciphertext = encrypt(
+                algorithm.to_string(),
+                password.to_string(),
+                plaintext.to_string(),
+            );
+            let found = get_algorithm_from_header(ciphertext.to_string());
+            println!("test05: {} ==? {}", algorithm, found);
+            assert_eq!(algorithm.to_string(), found);
+        }
+        let found = get_algorithm_from_header(plaintext.to_string());
+        assert!(found.starts_with("error:header:"));
+        println!("test05: done");
+    }
+
+    #[wasm_bindgen_test]
+    pub fn test06() {
+        // Verify the password generator.
+        println!("test06: start");
+        let alphabet = "ABCDEFabcdef0123_-";
+        let required = "ABCDEF\nabcdef\n0123\n_-";
+        let passwords = generate_passwords(alphabet.to_string(), 8, 12, required.to_string(), 1000);
+        assert!(!passwords.starts_with("error:"));
+        let passwords: Vec<&str> = passwords.split('\n').collect();
+        assert_eq!(passwords.len(), 1000);
+        for password in &passwords {
+            assert!(password.len() >= 8 && password.len() <= 12);
+            assert!(password.chars().all(|c| alphabet.contains(c)));
+            for class in required.split('\n') {
+                assert!(password.chars().any(|c| class.contains(c)));
+            }
+        }
+        let password = generate_password(alphabet.to_string(), 16, 16, "".to_string());
+        println!("test06: password={}", password);
+        assert_eq!(password.len(), 16);
+
+        let result = generate_password("".to_string(), 8, 12, "".to_string());
+        assert!(result.starts_with("error:password:invalid-alphabet"));
+        let result = generate_password(alphabet.to_string(), 12, 8, "".to_string());
+        assert!(result.starts_with("error:password:invalid-length"));
+        let result = generate_password(alphabet.to_string(), 8, 12, "xyz".to_string());
+        assert!(result.starts_with("error:password:class-not-in-alphabet"));
+        println!("test06: done");
+    }
 }
@@ -0,0 +1,789 @@
+//! # Batch Vault Tool
+//!
+//! A command line tool that processes myVault files in bulk using the
+//! same encryption code as the webapp so the files it writes are byte
+//! compatible with the files created by the Save page.
+//!
+//! The files are processed by a pool of worker threads, each worker
+//! reads, converts and writes one file at a time so the throughput
+//! scales with the number of cores.
+//!
+//! # Commands
+//! * `decrypt`: Decrypt vault files to `.json` files, requires `--output-dir`.
+//! * `encrypt`: Encrypt JSON files to `.txt` vault files, requires `--output-dir`.
+//! * `rekey`: Re-encrypt vault files using a new master password.
+//! * `convert`: Re-encrypt vault files using a different algorithm.
+//! * `validate`: Verify that vault files can be decrypted.
+//!
+//! # Passwords
+//! Passwords are never accepted on the command line because they would
+//! be visible to other processes. They are read from the
+//! `MYVAULT_PASSWORD` and `MYVAULT_NEW_PASSWORD` environment variables
+//! or from the files specified by `--password-file` and
+//! `--new-password-file`. The new password is only used by `rekey`,
+//! all of the other commands use the password so `MYVAULT_NEW_PASSWORD`
+//! is ignored by them and `--new-password-file` is an error.
+//!
+//! # Output Files
+//! Decrypted files are created with mode 0600 and re-encrypted files
+//! keep the permissions of the original file. The output file names are
+//! checked before any file is processed: an output that would replace
+//! one of the inputs (other than an in-place `rekey` or `convert`) or
+//! that would be written more than once is an error.
+//!
+//! # Example
+//! ```bash
+//! MYVAULT_PASSWORD=old MYVAULT_NEW_PASSWORD=new myvault-crypt rekey -j 8 vaults/*.txt
+//! ```
+use std::collections::HashSet;
+use std::env;
+use std::fs;
+use std::io::Write;
+#[cfg(unix)]
+use std::os::unix::fs::OpenOptionsExt;
+use std::path::{Path, PathBuf};
+use std::process;
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::{mpsc, Arc, Mutex};
+use std::thread;
+
+use crypt::{
+    decrypt, encrypt, get_algorithm, get_algorithm_from_header, get_num_algorithms,
+};
+
+/// The command line usage.
+const USAGE: &str = "usage: myvault-crypt COMMAND [OPTIONS] FILE...
+
+Process myVault files in bulk.
+
+commands:
+  decrypt   Decrypt vault files to .json files, requires --output-dir.
+  encrypt   Encrypt JSON files to .txt vault files, requires --output-dir.
+  rekey     Re-encrypt vault files using the new password.
+  convert   Re-encrypt vault files using the algorithm specified by --algorithm.
+  validate  Verify that the vault files can be decrypted.
+
+options:
+  -a, --algorithm ALG        The encryption algorithm, the default is the
+                             algorithm of the input file for rekey and
+                             the first algorithm for encrypt.
+  -h, --help                 This help message.
+  -j, --jobs N               The number of worker threads, the default is
+                             the number of cores.
+  -l, --list                 List the available algorithms.
+  -o, --output-dir DIR       Write the output files to DIR, the default for
+                             rekey and convert is to update the files in place.
+  --password-file FILE       Read the password from FILE, the default is
+                             the MYVAULT_PASSWORD environment variable.
+  --new-password-file FILE   Read the new password for rekey from FILE, the
+                             default is the MYVAULT_NEW_PASSWORD environment
+                             variable. It is not used by the other commands.
+";
+
+/// The extension of the files written by decrypt.
+const DECRYPT_EXTENSION: &str = "json";
+
+/// The extension of the files written by encrypt, the same as the
+/// files downloaded from the Save page.
+const ENCRYPT_EXTENSION: &str = "txt";
+
+/// The counter used to create unique temporary file names.
+static TMP_COUNTER: AtomicUsize = AtomicUsize::new(0);
+
+/// The batch operations.
+#[derive(Clone, Copy, PartialEq)]
+enum Command {
+    Decrypt,
+    Encrypt,
+    Rekey,
+    Convert,
+    Validate,
+}
+
+/// The command line options.
+struct Options {
+    command: Command,
+    password: String,
+    new_password: String,
+    algorithm: String,
+    output_dir: Option<PathBuf>,
+    jobs: usize,
+    files: Vec<PathBuf>,
+}
+
+/// Report an error and exit.
+///
+/// # Arguments
+/// * `msg`: The error message.
+fn fail(msg: String) -> ! {
+    eprintln!("error: {}", msg);
+    process::exit(2);
+}
+
+/// Is this a valid algorithm id?
+///
+/// # Arguments
+/// * `algorithm`: The provisional algorithm identifier.
+///
+/// # Returns
+/// True if it is valid or false otherwise.
+fn is_algorithm(algorithm: &str) -> bool {
+    (0..get_num_algorithms()).any(|i| get_algorithm(i) == algorithm)
+}
+
+/// Read a password from a file or from an environment variable.
+///
+/// Only the trailing newline is removed so passwords with leading or
+/// trailing spaces are preserved.
+///
+/// # Arguments
+/// * `file`: The password file, if one was specified.
+/// * `var`: The environment variable to use if there is no file.
+///
+/// # Returns
+/// The password, empty if it was not specified.
+fn read_password(file: Option<String>, var: &str) -> String {
+    let text = match file {
+        Some(path) => match fs::read_to_string(&path) {
+            Ok(v) => v,
+            Err(e) => fail(format!("cannot read password file \"{}\": {}", path, e)),
+        },
+        None => env::var(var).unwrap_or_default(),
+    };
+    let text = text.strip_suffix('\n').unwrap_or(&text);
+    text.strip_suffix('\r').unwrap_or(text).to_string()
+}
+
+/// Read the new password.
+///
+/// Only rekey changes the password, the other commands encrypt using
+/// the password so that an exported `MYVAULT_NEW_PASSWORD` cannot
+/// silently change it.
+///
+/// # Arguments
+/// * `command`: The command.
+/// * `file`: The new password file, if one was specified.
+///
+/// # Returns
+/// The new password, empty if the command does not use it, or an error
+/// message.
+fn read_new_password(command: Command, file: Option<String>) -> Result<String, String> {
+    if command != Command::Rekey {
+        if file.is_some() {
+            return Err("--new-password-file is only used by rekey".to_string());
+        }
+        return Ok(String::new());
+    }
+    let new_password = read_password(file, "MYVAULT_NEW_PASSWORD");
+    if new_password.is_empty() {
+        return Err(
+            "rekey requires a new password, use MYVAULT_NEW_PASSWORD or --new-password-file"
+                .to_string(),
+        );
+    }
+    Ok(new_password)
+}
+
+/// Parse the command line arguments.
+///
+/// # Returns
+/// The validated options.
+fn parse_args() -> Options {
+    let mut args = env::args().skip(1);
+    let mut command = None;
+    let mut algorithm = String::new();
+    let mut output_dir = None;
+    let mut jobs = thread::available_parallelism().map_or(1, |n| n.get());
+    let mut password_file = None;
+    let mut new_password_file = None;
+    let mut files = Vec::new();
+    while let Some(arg) = args.next() {
+        let mut value = |name: &str| match args.next() {
+            Some(v) => v,
+            None => fail(format!("missing value for {}", name)),
+        };
+        match arg.as_str() {
+            "-h" | "--help" => {
+                print!("{}", USAGE);
+                process::exit(0);
+            }
+            "-l" | "--list" => {
+                for i in 0..get_num_algorithms() {
+                    println!("{}", get_algorithm(i));
+                }
+                process::exit(0);
+            }
+            "-a" | "--algorithm" => algorithm = value(&arg),
+            "-o" | "--output-dir" => output_dir = Some(PathBuf::from(value(&arg))),
+            "-j" | "--jobs" => {
+                let v = value(&arg);
+                jobs = match v.parse::<usize>() {
+                    Ok(n) if n > 0 => n,
+                    _ => fail(format!("invalid number of jobs \"{}\"", v)),
+                }
+            }
+            "--password-file" => password_file = Some(value(&arg)),
+            "--new-password-file" => new_password_file = Some(value(&arg)),
+            _ if arg.starts_with('-') => fail(format!("unknown option \"{}\"", arg)),
+            _ if command.is_none() => {
+                command = Some(match arg.as_str() {
+                    "decrypt" => Command::Decrypt,
+                    "encrypt" => Command::Encrypt,
+                    "rekey" => Command::Rekey,
+                    "convert" => Command::Convert,
+                    "validate" => Command::Validate,
+                    _ => fail(format!("unknown command \"{}\"\n{}", arg, USAGE)),
+                })
+            }
+            _ => files.push(PathBuf::from(arg)),
+        }
+    }
+
+    let command = match command {
+        Some(v) => v,
+        None => fail(format!("missing command\n{}", USAGE)),
+    };
+    if files.is_empty() {
+        fail("no files specified".to_string());
+    }
+    if !algorithm.is_empty() && !is_algorithm(&algorithm) {
+        fail(format!("invalid algorithm \"{}\", try --list", algorithm));
+    }
+    if command == Command::Convert && algorithm.is_empty() {
+        fail("convert requires --algorithm".to_string());
+    }
+    if command == Command::Encrypt && algorithm.is_empty() {
+        algorithm = get_algorithm(0);
+    }
+    if (command == Command::Decrypt || command == Command::Encrypt) && output_dir.is_none() {
+        fail("decrypt and encrypt require --output-dir".to_string());
+    }
+    if let Some(dir) = &output_dir {
+        if let Err(e) = fs::create_dir_all(dir) {
+            fail(format!("cannot create output directory \"{}\": {}", dir.display(), e));
+        }
+    }
+
+    let password = read_password(password_file, "MYVAULT_PASSWORD");
+    if password.is_empty() {
+        fail("no password, use MYVAULT_PASSWORD or --password-file".to_string());
+    }
+    let new_password = match read_new_password(command, new_password_file) {
+        Ok(v) => v,
+        Err(msg) => fail(msg),
+    };
+
+    Options {
+        command,
+        password,
+        new_password,
+        algorithm,
+        output_dir,
+        jobs,
+        files,
+    }
+}
+
+/// Decrypt a vault file.
+///
+/// The algorithm is determined from the header so the caller does not
+/// need to know it.
+///
+/// # Arguments
+/// * `password`: The master password.
+/// * `text`: The encrypted file contents.
+///
+/// # Returns
+/// The algorithm and the plaintext or an error message.
+fn decrypt_text(password: &str, text: &str) -> Result<(String, String), String> {
+    let text = text.trim(); // the same as load.js
+    let algorithm = get_algorithm_from_header(text.to_string());
+    if algorithm.starts_with("error:") {
+        return Err(algorithm);
+    }
+    let plaintext = decrypt(algorithm.to_string(), password.to_string(), text.to_string());
+    if plaintext.starts_with("error:") {
+        return Err(plaintext);
+    }
+    check_json(&plaintext)?;
+    Ok((algorithm, plaintext))
+}
+
+/// Encrypt plaintext the same way that save.js does.
+///
+/// # Arguments
+/// * `algorithm`: The encryption algorithm.
+/// * `password`: The master password.
+/// * `plaintext`: The JSON data.
+///
+/// # Returns
+/// The encrypted text or an error message.
+fn encrypt_text(algorithm: &str, password: &str, plaintext: &str) -> Result<String, String> {
+    let plaintext = set_json_algorithm(plaintext, algorithm);
+    let text = encrypt(algorithm.to_string(), password.to_string(), plaintext);
+    if text.starts_with("error:") {
+        return Err(text);
+    }
+    Ok(text)
+}
+
+/// Verify that the plaintext looks like the JSON data written by save.js.
+///
+/// This is the same test that load.js uses.
+///
+/// # Arguments
+/// * `plaintext`: The decrypted data.
+///
+/// # Returns
+/// An error message if it is not valid.
+fn check_json(plaintext: &str) -> Result<(), String> {
+    let text = plaintext.trim();
+    if !text.starts_with('{') || !text.ends_with('}') {
+        return Err("error:validate: decrypted data is not JSON".to_string());
+    }
+    Ok(())
+}
+
+/// Update the algorithm stored in the JSON data.
+///
+/// The data is not re-serialized because that would change the
+/// formatting, only the value of the first "algorithm" key is
+/// replaced which is the "crypt" entry in files written by save.js.
+///
+/// # Arguments
+/// * `plaintext`: The JSON data.
+/// * `algorithm`: The new algorithm.
+///
+/// # Returns
+/// The updated JSON data.
+fn set_json_algorithm(plaintext: &str, algorithm: &str) -> String {
+    let key = "\"algorithm\": \"";
+    if let Some(start) = plaintext.find(key).map(|i| i + key.len()) {
+        if let Some(len) = plaintext[start..].find('"') {
+            let old = &plaintext[start..start + len];
+            if old != algorithm && is_algorithm(old) {
+                return format!("{}{}{}", &plaintext[..start], algorithm, &plaintext[start + len..]);
+            }
+        }
+    }
+    plaintext.to_string()
+}
+
+/// Write a file atomically.
+///
+/// The data is written to a temporary file in the same directory that
+/// is then renamed so an interrupted run never leaves a partially
+/// written vault. The temporary file is created with mode 0600 so the
+/// data is never readable by other users, even briefly.
+///
+/// # Arguments
+/// * `path`: The output file.
+/// * `data`: The file contents.
+/// * `perms`: The permissions of the output file, the default is 0600.
+fn write_file(path: &Path, data: &str, perms: Option<fs::Permissions>) -> Result<(), String> {
+    let mut tmp = path.as_os_str().to_owned();
+    let count = TMP_COUNTER.fetch_add(1, Ordering::SeqCst);
+    tmp.push(format!(".tmp{}.{}", process::id(), count));
+    let tmp = PathBuf::from(tmp);
+    let mut options = fs::OpenOptions::new();
+    options.write(true).create_new(true);
+    #[cfg(unix)]
+    options.mode(0o600);
+    let result = options
+        .open(&tmp)
+        .and_then(|mut file| {
+            file.write_all(data.as_bytes())?;
+            if let Some(perms) = perms {
+                file.set_permissions(perms)?;
+            }
+            Ok(())
+        })
+        .map_err(|e| format!("cannot write \"{}\": {}", tmp.display(), e))
+        .and_then(|_| {
+            fs::rename(&tmp, path).map_err(|e| format!("cannot rename \"{}\": {}", tmp.display(), e))
+        });
+    if result.is_err() {
+        let _ = fs::remove_file(&tmp);
+    }
+    result
+}
+
+/// Get the output file for an input file.
+///
+/// Decrypted and encrypted files are given a new extension so that
+/// the plaintext can never be mistaken for a vault file.
+///
+/// # Arguments
+/// * `opts`: The command line options.
+/// * `path`: The input file.
+///
+/// # Returns
+/// The output file or None for commands that do not write files.
+fn output_path(opts: &Options, path: &Path) -> Option<PathBuf> {
+    let name = PathBuf::from(path.file_name().unwrap_or_default());
+    let name = match opts.command {
+        Command::Validate => return None,
+        Command::Decrypt => name.with_extension(DECRYPT_EXTENSION),
+        Command::Encrypt => name.with_extension(ENCRYPT_EXTENSION),
+        Command::Rekey | Command::Convert => name,
+    };
+    match &opts.output_dir {
+        Some(dir) => Some(dir.join(name)),
+        None => Some(path.to_path_buf()),
+    }
+}
+
+/// Normalize a path so that different names for the same file compare equal.
+///
+/// Files that do not exist yet are resolved using their directory.
+///
+/// # Arguments
+/// * `path`: The path.
+///
+/// # Returns
+/// The normalized path.
+fn normalize_path(path: &Path) -> PathBuf {
+    if let Ok(v) = fs::canonicalize(path) {
+        return v;
+    }
+    let dir = match path.parent() {
+        Some(v) if !v.as_os_str().is_empty() => v,
+        _ => Path::new("."),
+    };
+    match (fs::canonicalize(dir), path.file_name()) {
+        (Ok(dir), Some(name)) => dir.join(name),
+        _ => path.to_path_buf(),
+    }
+}
+
+/// Verify that the output files are distinct and do not replace the
+/// input files.
+///
+/// This is done before any file is processed so that a bad command
+/// line, like decrypting into the vault directory or two inputs with
+/// the same file name, does not destroy any data. Only rekey and
+/// convert without --output-dir are allowed to update the inputs.
+///
+/// # Arguments
+/// * `opts`: The command line options.
+///
+/// # Returns
+/// An error message if there is a conflict.
+fn check_outputs(opts: &Options) -> Result<(), String> {
+    let in_place = opts.output_dir.is_none();
+    let inputs: HashSet<PathBuf> = opts.files.iter().map(|p| normalize_path(p)).collect();
+    let mut outputs = HashSet::new();
+    for path in &opts.files {
+        let output = match output_path(opts, path) {
+            Some(v) => normalize_path(&v),
+            None => continue,
+        };
+        if !in_place && inputs.contains(&output) {
+            return Err(format!(
+                "output file \"{}\" would replace an input file",
+                output.display()
+            ));
+        }
+        if !outputs.insert(output.clone()) {
+            return Err(format!(
+                "output file \"{}\" would be written more than once",
+                output.display()
+            ));
+        }
+    }
+    Ok(())
+}
+
+/// Process a single file.
+///
+/// # Arguments
+/// * `opts`: The command line options.
+/// * `path`: The input file.
+///
+/// # Returns
+/// A status message or an error message.
+fn process_file(opts: &Options, path: &Path) -> Result<String, String> {
+    let text = fs::read_to_string(path).map_err(|e| format!("cannot read: {}", e))?;
+    let output = output_path(opts, path).unwrap_or_default();
+    match opts.command {
+        Command::Validate => {
+            let (algorithm, plaintext) = decrypt_text(&opts.password, &text)?;
+            Ok(format!("{} {} bytes", algorithm, plaintext.len()))
+        }
+        Command::Decrypt => {
+            let (algorithm, plaintext) = decrypt_text(&opts.password, &text)?;
+            write_file(&output, &plaintext, None)?;
+            Ok(format!("{} -> {}", algorithm, output.display()))
+        }
+        Command::Encrypt => {
+            check_json(&text)?;
+            let result = encrypt_text(&opts.algorithm, &opts.password, text.trim())?;
+            write_file(&output, &result, None)?;
+            Ok(format!("{} -> {}", opts.algorithm, output.display()))
+        }
+        Command::Rekey | Command::Convert => {
+            let (algorithm, plaintext) = decrypt_text(&opts.password, &text)?;
+            let target = if opts.algorithm.is_empty() { &algorithm } else { &opts.algorithm };
+            let password = if opts.command == Command::Rekey {
+                &opts.new_password
+            } else {
+                &opts.password
+            };
+            let result = encrypt_text(target, password, &plaintext)?;
+            let perms = fs::metadata(path).map_err(|e| format!("cannot stat: {}", e))?.permissions();
+            write_file(&output, &result, Some(perms))?;
+            Ok(format!("{} -> {} {}", algorithm, target, output.display()))
+        }
+    }
+}
+
+/// Process the files using a pool of worker threads.
+///
+/// The workers pull the next file from a shared queue so that large
+/// and small files are balanced across the threads.
+///
+/// # Returns
+/// The number of files that failed.
+fn run(opts: Options) -> usize {
+    let opts = Arc::new(opts);
+    let queue = Arc::new(Mutex::new(opts.files.clone().into_iter()));
+    let (tx, rx) = mpsc::channel();
+    let jobs = std::cmp::min(opts.jobs, opts.files.len());
+    let mut workers = Vec::with_capacity(jobs);
+    for _ in 0..jobs {
+        let opts = Arc::clone(&opts);
+        let queue = Arc::clone(&queue);
+        let tx = tx.clone();
+        workers.push(thread::spawn(move || loop {
+            let next = queue.lock().unwrap().next();
+            let path = match next {
+                Some(v) => v,
+                None => break,
+            };
+            let result = process_file(&opts, &path);
+            tx.send((path, result)).unwrap();
+        }));
+    }
+    drop(tx);
+
+    let mut errors = 0;
+    for (path, result) in rx {
+        match result {
+            Ok(msg) => println!("ok: {}: {}", path.display(), msg),
+            Err(msg) => {
+                errors += 1;
+                eprintln!("error: {}: {}", path.display(), msg);
+            }
+        }
+    }
+    for worker in workers {
+        worker.join().unwrap();
+    }
+    errors
+}
+
+fn main() {
+    let opts = parse_args();
+    if let Err(msg) = check_outputs(&opts) {
+        fail(msg);
+    }
+    let total = opts.files.len();
+    let errors = run(opts);
+    println!("{} files, {} errors", total, errors);
+    if errors > 0 {
+        process::exit(1);
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    /// Create an empty scratch directory for a test.
+    fn scratch(name: &str) -> PathBuf {
+        let dir = env::temp_dir().join(format!("myvault-crypt-{}-{}", process::id(), name));
+        let _ = fs::remove_dir_all(&dir);
+        fs::create_dir_all(&dir).unwrap();
+        dir
+    }
+
+    /// Create the options for a test.
+    fn options(command: Command, output_dir: Option<PathBuf>, files: Vec<PathBuf>) -> Options {
+        Options {
+            command,
+            password: "secret".to_string(),
+            new_password: String::new(),
+            algorithm: String::new(),
+            output_dir,
+            jobs: 1,
+            files,
+        }
+    }
+
+    /// Create a vault file.
+    fn make_vault(path: &Path, password: &str) {
+        let plaintext = format!("{{\"crypt\": {{\"algorithm\": \"{}\"}}}}", get_algorithm(0));
+        let text = encrypt_text(&get_algorithm(0), password, &plaintext).unwrap();
+        fs::write(path, text).unwrap();
+    }
+
+    #[cfg(unix)]
+    fn mode(path: &Path) -> u32 {
+        use std::os::unix::fs::PermissionsExt;
+        fs::metadata(path).unwrap().permissions().mode() & 0o777
+    }
+
+    #[test]
+    pub fn test01() {
+        // Verify that only the algorithm value is replaced.
+        let al0 = get_algorithm(0);
+        let al1 = get_algorithm(1);
+        let plaintext = format!("{{\n  \"crypt\": {{\"algorithm\": \"{}\"}},\n  \"x\": 1\n}}", al0);
+        let expected = format!("{{\n  \"crypt\": {{\"algorithm\": \"{}\"}},\n  \"x\": 1\n}}", al1);
+        assert_eq!(set_json_algorithm(&plaintext, &al1), expected);
+        assert_eq!(set_json_algorithm(&plaintext, &al0), plaintext);
+
+        // Unknown algorithms and missing keys are left alone.
+        let unknown = "{\"algorithm\": \"bad-bad-bad\"}";
+        assert_eq!(set_json_algorithm(unknown, &al1), unknown);
+        let missing = "{\"records\": []}";
+        assert_eq!(set_json_algorithm(missing, &al1), missing);
+    }
+
+    #[test]
+    pub fn test02() {
+        // Verify that only the trailing newline is removed from passwords.
+        let dir = scratch("test02");
+        let file = dir.join("password");
+        fs::write(&file, " pass word \r\n").unwrap();
+        assert_eq!(read_password(Some(file.display().to_string()), "UNUSED"), " pass word ");
+        fs::write(&file, "a\n\n").unwrap();
+        assert_eq!(read_password(Some(file.display().to_string()), "UNUSED"), "a\n");
+
+        env::set_var("MYVAULT_TEST02_PASSWORD", "env pass\n");
+        assert_eq!(read_password(None, "MYVAULT_TEST02_PASSWORD"), "env pass");
+        assert_eq!(read_password(None, "MYVAULT_TEST02_MISSING"), "");
+        let _ = fs::remove_dir_all(&dir);
+    }
+
+    #[test]
+    pub fn test03() {
+        // Verify that decrypt writes private .json files.
+        let dir = scratch("test03");
+        let vault = dir.join("f.txt");
+        make_vault(&vault, "secret");
+        let out = dir.join("out");
+        fs::create_dir_all(&out).unwrap();
+        let opts = options(Command::Decrypt, Some(out.clone()), vec![vault.clone()]);
+        assert!(check_outputs(&opts).is_ok());
+        process_file(&opts, &vault).unwrap();
+        let json = out.join("f.json");
+        assert!(fs::read_to_string(&json).unwrap().starts_with('{'));
+        #[cfg(unix)]
+        assert_eq!(mode(&json), 0o600);
+
+        // A bad password is an error and nothing is written.
+        let mut opts = options(Command::Validate, None, vec![vault.clone()]);
+        opts.password = "wrong".to_string();
+        assert!(process_file(&opts, &vault).is_err());
+        let _ = fs::remove_dir_all(&dir);
+    }
+
+    #[test]
+    pub fn test04() {
+        // Verify that rekey in place keeps the permissions.
+        let dir = scratch("test04");
+        let vault = dir.join("f.txt");
+        make_vault(&vault, "secret");
+        #[cfg(unix)]
+        {
+            use std::os::unix::fs::PermissionsExt;
+            fs::set_permissions(&vault, fs::Permissions::from_mode(0o640)).unwrap();
+        }
+        let mut opts = options(Command::Rekey, None, vec![vault.clone()]);
+        opts.new_password = "new".to_string();
+        assert!(check_outputs(&opts).is_ok());
+        process_file(&opts, &vault).unwrap();
+        #[cfg(unix)]
+        assert_eq!(mode(&vault), 0o640);
+        let text = fs::read_to_string(&vault).unwrap();
+        assert!(decrypt_text("new", &text).is_ok());
+        assert!(decrypt_text("secret", &text).is_err());
+        let names: Vec<_> = fs::read_dir(&dir).unwrap().collect();
+        assert_eq!(names.len(), 1); // no temporary files left behind
+        let _ = fs::remove_dir_all(&dir);
+    }
+
+    #[test]
+    pub fn test05() {
+        // Verify that conflicting output files are rejected.
+        let dir = scratch("test05");
+        for sub in &["d1", "d2"] {
+            fs::create_dir_all(dir.join(sub)).unwrap();
+            make_vault(&dir.join(sub).join("f.txt"), "secret");
+        }
+        let f1 = dir.join("d1").join("f.txt");
+        let f2 = dir.join("d2").join("f.txt");
+
+        // The same file name from two directories.
+        let opts = options(Command::Decrypt, Some(dir.join("out")), vec![f1.clone(), f2.clone()]);
+        fs::create_dir_all(dir.join("out")).unwrap();
+        assert!(check_outputs(&opts).unwrap_err().contains("more than once"));
+
+        // Re-encrypting into the input directory.
+        let opts = options(Command::Rekey, Some(dir.join("d1")), vec![f1.clone()]);
+        assert!(check_outputs(&opts).unwrap_err().contains("replace an input"));
+
+        // Decrypting a vault named .json into its own directory.
+        let json = dir.join("d1").join("g.json");
+        fs::copy(&f1, &json).unwrap();
+        let opts = options(Command::Decrypt, Some(dir.join("d1")), vec![json]);
+        assert!(check_outputs(&opts).unwrap_err().contains("replace an input"));
+
+        // The same file twice in place.
+        let opts = options(Command::Rekey, None, vec![f1.clone(), dir.join("d2/../d1/f.txt")]);
+        assert!(check_outputs(&opts).unwrap_err().contains("more than once"));
+
+        // Validate writes nothing.
+        let opts = options(Command::Validate, None, vec![f1.clone(), f1]);
+        assert!(check_outputs(&opts).is_ok());
+        let _ = fs::remove_dir_all(&dir);
+    }
+
+    #[test]
+    pub fn test06() {
+        // Verify that only rekey uses the new password.
+        env::set_var("MYVAULT_NEW_PASSWORD", "stale");
+        assert_eq!(read_new_password(Command::Rekey, None).unwrap(), "stale");
+        assert_eq!(read_new_password(Command::Convert, None).unwrap(), "");
+        assert_eq!(read_new_password(Command::Encrypt, None).unwrap(), "");
+        let file = Some("new-password.txt".to_string());
+        assert!(read_new_password(Command::Convert, file.clone()).is_err());
+        assert!(read_new_password(Command::Validate, file).is_err());
+
+        // Convert keeps the password.
+        let dir = scratch("test06");
+        let vault = dir.join("f.txt");
+        make_vault(&vault, "secret");
+        let mut opts = options(Command::Convert, None, vec![vault.clone()]);
+        opts.algorithm = get_algorithm(1);
+        opts.new_password = read_new_password(Command::Convert, None).unwrap();
+        process_file(&opts, &vault).unwrap();
+        let text = fs::read_to_string(&vault).unwrap();
+        let (algorithm, _) = decrypt_text("secret", &text).unwrap();
+        assert_eq!(algorithm, get_algorithm(1));
+        assert!(decrypt_text("stale", &text).is_err());
+
+        // Encrypt uses the password.
+        let json = dir.join("g.json");
+        fs::write(&json, "{\"records\": []}").unwrap();
+        let out = dir.join("out");
+        fs::create_dir_all(&out).unwrap();
+        let mut opts = options(Command::Encrypt, Some(out.clone()), vec![json.clone()]);
+        opts.algorithm = get_algorithm(0);
+        process_file(&opts, &json).unwrap();
+        let text = fs::read_to_string(out.join("g.txt")).unwrap();
+        assert!(decrypt_text("secret", &text).is_ok());
+        let _ = fs::remove_dir_all(&dir);
+    }
+}
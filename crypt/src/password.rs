@@ -0,0 +1,117 @@
+/// Implementation of the cryptic password generator.
+use rand::rngs::OsRng;
+use rand::RngCore;
+
+/// The maximum password length.
+pub const MAX_LENGTH: usize = 1024;
+
+/// The maximum number of passwords in a batch.
+pub const MAX_COUNT: usize = 100_000;
+
+/// The maximum number of attempts to satisfy the required character classes.
+const MAX_ATTEMPTS: usize = 10_000;
+
+/// Return an unbiased random number in the range [0, n).
+///
+/// It uses rejection sampling: values in the incomplete last block of
+/// the u32 range are discarded so that every result is equally likely,
+/// unlike `x % n`.
+///
+/// # Arguments
+/// * `rng`: The cryptographically secure random number generator.
+/// * `n`: The upper bound, must be greater than zero.
+///
+/// # Returns
+/// The random number.
+fn uniform(rng: &mut OsRng, n: u32) -> u32 {
+    let zone = u32::MAX - (u32::MAX % n);
+    loop {
+        let x = rng.next_u32();
+        if x < zone {
+            return x % n;
+        }
+    }
+}
+
+/// Generate a batch of cryptic passwords.
+///
+/// Each password length is chosen uniformly from [minlen, maxlen] and
+/// each character uniformly from the alphabet. Passwords that do not
+/// contain at least one character from each required class are
+/// discarded and regenerated, including a new length, so each password
+/// is uniform over the valid passwords of its length. The lengths are
+/// not exactly uniform because short passwords are more likely to be
+/// rejected.
+///
+/// # Arguments
+/// * `alphabet`: The characters to choose from.
+/// * `minlen`: The minimum password length.
+/// * `maxlen`: The maximum password length.
+/// * `required`: The required character classes separated by newlines, can be empty.
+/// * `count`: The number of passwords to generate.
+///
+/// # Returns
+/// The passwords separated by newlines.
+pub fn generate(
+    alphabet: String,
+    minlen: usize,
+    maxlen: usize,
+    required: String,
+    count: usize,
+) -> String {
+    let chars: Vec<char> = alphabet.chars().collect();
+    if chars.is_empty() || chars.contains(&'\n') {
+        return "error:password:invalid-alphabet".to_string();
+    }
+    if minlen == 0 || minlen > maxlen || maxlen > MAX_LENGTH {
+        return format!("error:password:invalid-length:{}:{}", minlen, maxlen);
+    }
+    if count > MAX_COUNT {
+        return format!("error:password:invalid-count:{}", count);
+    }
+    let classes: Vec<Vec<char>> = required
+        .split('\n')
+        .filter(|c| !c.is_empty())
+        .map(|c| c.chars().collect())
+        .collect();
+    if classes.len() > minlen {
+        return format!("error:password:too-many-classes:{}", classes.len());
+    }
+    for class in &classes {
+        if !class.iter().any(|c| chars.contains(c)) {
+            return format!(
+                "error:password:class-not-in-alphabet:{}",
+                class.iter().collect::<String>()
+            );
+        }
+    }
+
+    let mut rng = OsRng;
+    let mut result = String::with_capacity(count * (maxlen + 1));
+    let mut password = String::with_capacity(maxlen * 4);
+    for i in 0..count {
+        let mut attempts = 0;
+        loop {
+            attempts += 1;
+            if attempts > MAX_ATTEMPTS {
+                return "error:password:cannot-satisfy-classes".to_string();
+            }
+            let length = minlen + uniform(&mut rng, (maxlen - minlen + 1) as u32) as usize;
+            password.clear();
+            for _ in 0..length {
+                password.push(chars[uniform(&mut rng, chars.len() as u32) as usize]);
+            }
+            if classes
+                .iter()
+                .all(|class| password.chars().any(|c| class.contains(&c)))
+            {
+                break;
+            }
+        }
+        if i > 0 {
+            result.push('\n');
+        }
+        result.push_str(&password);
+    }
+    result
+}
@@ -1,20 +1,44 @@
 '''
 Test the UI using pylenium.
 
-USE_MP=true PORT=8000 pipenv run python -m pytest tests/test_ui.py
+The tests are served by an internal threaded web server that binds an
+ephemeral port for each test session so the tests can be run in
+parallel using pytest-xdist:
+
+pipenv run python -m pytest -n auto tests/test_ui.py
+
+To use an external server instead, specify its URL:
+
+URL=http://localhost:8000 pipenv run python -m pytest tests/test_ui.py
 '''
+import email.utils
+import functools
+import gzip
 import http.server
-from multiprocessing import Process
 import inspect
+import io
 import os
-import socketserver
+import re
+import threading
 import time
 from pathlib import Path
 import pytest
 import pyclip
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support import expected_conditions
+from selenium.webdriver.support.ui import WebDriverWait
+
+# pylint: disable=redefined-outer-name  # the url fixture
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
 
-# The test port must be different than the production port.
-PORT = int(os.environ.get('PORT', 8007))
+# The test port, zero means choose an ephemeral port.
+# Ephemeral ports are always used when running in parallel because
+# each pytest-xdist worker runs its own server.
+PORT = 0 if 'PYTEST_XDIST_WORKER' in os.environ else int(os.environ.get('PORT', 0))
 
 # The localhost.
 LOCALHOST = 'localhost'
@@ -26,10 +50,13 @@ DBT = float(os.environ.get('DBT', 0.5))
 # By default it uses an internal server running as a session fixture
 # but the user can use an external server if they want.
 # Here is an example usage:
-# DBT=2 PORT=8007 pipenv run python -m pytest tests/test_ui.py::test_records
-URL = f'http://{LOCALHOST}:{PORT}'
-USE_MP = bool(os.environ.get('PORT', True))
-PROCESS = None
+# DBT=2 URL=http://localhost:8000 pipenv run python -m pytest tests/test_ui.py::test_records
+EXTERNAL_URL = os.environ.get('URL', '')
+
+# The files are static for the duration of the test session so they
+# can be cached by the browser.
+CACHE_CONTROL = 'public, max-age=3600'
+
 
 def is_headless(py):
     '''Are we in headless mode?
@@ -41,24 +68,85 @@ def is_headless(py):
     return 'headless' in py.config.driver.options
 
 
-def serve():
+class Handler(http.server.SimpleHTTPRequestHandler):
     '''
-    Run the server in a separate thread/process.
+    Serve the static files with the cache headers and the
+    precompressed variants that a production server would use.
+
+    The compressed variants are created the first time that a file is
+    requested and then cached in memory for the rest of the session.
     '''
-    src_path = Path(__file__).resolve()
-    project_dir = src_path.parent.parent
-    www = Path(project_dir, 'www')
-    debug(f'project: {project_dir}')
-    debug(f'www: {www}')
-    debug(f'port: {PORT}')
-    os.chdir(www)
-    handler = http.server.SimpleHTTPRequestHandler
-    socketserver.TCPServer.allow_reuse_address = True
-    with socketserver.TCPServer(("localhost", PORT), handler) as httpd:
-        print("serving at port", PORT)
-        httpd.allow_reuse_address = True
-        httpd.serve_forever()
-        debug('server started')
+    extensions_map = {
+        **http.server.SimpleHTTPRequestHandler.extensions_map,
+        '.js': 'text/javascript',
+        '.wasm': 'application/wasm',
+        '.svg': 'image/svg+xml',
+    }
+
+    # The compressed variants: {(path, mtime, encoding): bytes}.
+    cache = {}
+    cache_lock = threading.Lock()
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        '''Keep the test output quiet.'''
+
+    def encodings(self):
+        '''The supported encodings that the client accepts in order of preference.'''
+        accepted = [x.split(';')[0].strip()
+                    for x in self.headers.get('Accept-Encoding', '').split(',')]
+        result = []
+        if brotli and 'br' in accepted:
+            result.append('br')
+        if 'gzip' in accepted:
+            result.append('gzip')
+        return result
+
+    def compressed(self, path, mtime, encoding):
+        '''Get the compressed variant of a file.'''
+        key = (path, mtime, encoding)
+        with Handler.cache_lock:
+            if key in Handler.cache:
+                return Handler.cache[key]
+        data = Path(path).read_bytes()
+        if encoding == 'br':
+            data = brotli.compress(data)
+        else:
+            data = gzip.compress(data, mtime=0)
+        with Handler.cache_lock:
+            Handler.cache[key] = data
+        return data
+
+    def send_head(self):
+        '''Send the response headers, return the body as a file-like object.'''
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) or not os.path.isfile(path):
+            return super().send_head()  # directory listings and errors
+        stat = os.stat(path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(http.HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', CACHE_CONTROL)
+            self.end_headers()
+            return None
+        encodings = self.encodings()
+        if encodings:
+            encoding = encodings[0]
+            data = self.compressed(path, stat.st_mtime_ns, encoding)
+        else:
+            encoding = None
+            data = Path(path).read_bytes()
+        self.send_response(http.HTTPStatus.OK)
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('Content-Length', str(len(data)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Cache-Control', CACHE_CONTROL)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(stat.st_mtime, usegmt=True))
+        self.end_headers()
+        return io.BytesIO(data)
 
 
 def debug(msg: str, level: int = 1):
@@ -70,35 +158,92 @@ def debug(msg: str, level: int = 1):
     print(f'\x1b[35mDEBUG:{fname}:{lineno}: {msg}\x1b[0m')
 
 
-def epilogue():
-    '''stop the server when the session ends '''
-    debug('epilogue')
-    if USE_MP:
-        PROCESS.terminate()
+@pytest.fixture(scope='session')
+def url():
+    '''
+    Run the server in a separate thread for the test session and
+    return its URL.
+
+    Each pytest-xdist worker has its own session so each one runs
+    its own server on its own port.
+    '''
+    if EXTERNAL_URL:
+        debug(f'URL: {EXTERNAL_URL}')
+        yield EXTERNAL_URL
+        return
+    src_path = Path(__file__).resolve()
+    project_dir = src_path.parent.parent
+    www = Path(project_dir, 'www')
+    debug(f'project: {project_dir}')
+    debug(f'www: {www}')
+    handler = functools.partial(Handler, directory=str(www))
+    http.server.ThreadingHTTPServer.allow_reuse_address = True
+    with http.server.ThreadingHTTPServer((LOCALHOST, PORT), handler) as httpd:
+        httpd.daemon_threads = True
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        port = httpd.server_address[1]
+        worker = os.environ.get('PYTEST_XDIST_WORKER', 'main')
+        debug(f'server started for {worker} on port {port}')
+        yield f'http://{LOCALHOST}:{port}'
+        httpd.shutdown()
+        thread.join()
+        debug('server stopped')
+
+
+def wait_until(func, timeout=10.0):
+    '''Wait until func() returns a true value.
+
+    The raw data editor validates and formats the data in a worker so
+    the tests poll for the result instead of sleeping.
+    '''
+    end = time.time() + timeout
+    value = func()
+    while not value and time.time() < end:
+        time.sleep(0.1)
+        value = func()
+    return value
+
+
+def accept_alert(py, timeout=10.0):
+    '''Wait for an alert, accept it and return its text.'''
+    alert = WebDriverWait(py.webdriver, timeout).until(expected_conditions.alert_is_present())
+    text = alert.text
+    alert.accept()
+    return text
 
 
-def prologue():
-    '''test sesssion prologue'''
-    debug('prologue')
-    if USE_MP:
-        global PROCESS # pylint: disable=global-statement
-        debug(f'starting server on {PORT}')
-        PROCESS = Process(target=serve)
-        PROCESS.start()
-        debug(f'URL: {URL}')
+def load_example(py):
+    '''Load the internal example from the load page.
+
+    Returns the load page accordion entries.
+    '''
+    py.get('#x-topmenu-button').click()
+    py.get('#x-menu-content').children()[2].click() # load
+    assert py.get('#x-load-content-id') # wait for the load page module
+    plist = py.get('#page-load').children()
+    plist[1].click() # open panel
+    button = plist[1].children()[1].children()[0].children()[1].children()[0]
+    assert button.tag_name() == 'button'
+    button.click() ## load example
+    time.sleep(DBT)
+    return plist
 
 
-@pytest.fixture(scope="session", autouse=True)
-def oneshot(request):
-    'setup the prologue and epilogue before of all the tests in a session'
-    request.addfinalizer(epilogue)
-    prologue()
+def raw_lines(view):
+    '''Get the text of the visible lines in the raw data editor.'''
+    return [line.text() for line in view.children()[1].children()]
 
 
-VISITED = False
-def test_about(py):
+def find_raw_line(view, text):
+    '''Find the visible line in the raw data editor that contains text.'''
+    lines = [line for line in view.children()[1].children() if text in line.text()]
+    return lines[0] if lines else None
+
+
+def test_about(py, url):
     'about dialogue'
-    py.visit(URL)
+    py.visit(url)
     assert py.find('#x-topmenu-button')
     time.sleep(1)
     py.get('#x-topmenu-button').click()
@@ -120,9 +265,9 @@ def test_about(py):
     time.sleep(DBT)
 
 
-def test_prefs(py):  # pylint: disable=too-many-statements,too-many-locals
+def test_prefs(py, url):  # pylint: disable=too-many-statements,too-many-locals
     'preferences'
-    py.visit(URL)
+    py.visit(url)
     assert py.find('#x-topmenu-button')
     py.get('#x-topmenu-button').click() # open the menu
     py.get('#x-menu-content').children()[1].click() # preferences
@@ -306,10 +451,42 @@ def test_prefs(py):  # pylint: disable=too-many-statements,too-many-locals
     py.get('#x-menu-content').children()[3].click() # records
     time.sleep(DBT)
 
+    # Record Field Name Type Map, an invalid entry is rejected
+    py.get('#x-topmenu-button').click() # open the menu
+    py.get('#x-menu-content').children()[1].click() # preferences
+    plist = py.get('#page-prefs').children()
+    plist[6].click() # open panel
+    ftype = py.get('#x-prefs-ftype-buffer')
+    save_button = plist[6].children()[1].find('button')[1]
+    ftype.type(Keys.CONTROL + 'a' + Keys.NULL,
+               '[{"rex": "pin", "type": "password"}, {"rex": "code", "type": "pin"}]')
+    save_button.click()
+    assert 'cannot save, invalid entry 1: {"rex":"code","type":"pin"}' in accept_alert(py)
+    time.sleep(DBT)
+
+    # a custom field type is used to render the records
+    ftype.type(Keys.CONTROL + 'a' + Keys.NULL, '[{"rex": "pin", "type": "password"}]')
+    save_button.click()
+    time.sleep(DBT)
+    load_example(py)[4].click() # open the view raw data panel
+    view = py.get('#x-load-raw-data-buffer')
+    status = py.get('#x-load-raw-data-buffer-status')
+    assert wait_until(lambda: status.text().endswith(' lines, 11 records'))
+    find_raw_line(view, '"__id__": "AWS"').children()[1].click()
+    view.find('textarea')[0].type(Keys.END, Keys.SHIFT + Keys.ENTER + Keys.NULL,
+                                  '"pin": "1234",', '\n')
+    assert wait_until(lambda: find_raw_line(view, '"pin": "1234",'))
+    assert 'invalid' not in status.text()
+    py.get('#x-topmenu-button').click() # open the menu
+    py.get('#x-menu-content').children()[3].click() # records
+    records = py.get('#x-data-records-div').children()
+    [record for record in records if 'AWS' in record.text()][0].click() # open
+    assert py.get('input[placeholder="field pin value"]').get_attribute('type') == 'password'
+
 
-def test_load(py):
+def test_load(py, url):
     'load'
-    py.visit(URL)
+    py.visit(url)
     assert py.find('#x-topmenu-button')
     py.get('#x-topmenu-button').click()
     py.get('#x-menu-content').children()[2].click() # load
@@ -358,12 +535,119 @@ def test_load(py):
     topc[2].click()  # collapse all
 
 
-def test_records(py): # pylint: disable=too-many-locals,too-many-statements
+def test_raw_edit(py, url):  # pylint: disable=too-many-statements
+    'raw data editor'
+    py.visit(url)
+    plist = load_example(py)
+    topc = py.get('#x-load-content-id').children()
+    topc[2].click()  # collapse all
+    plist[4].click() # open the view raw data panel
+    view = py.get('#x-load-raw-data-buffer')
+    status = py.get('#x-load-raw-data-buffer-status')
+    assert wait_until(lambda: status.text().endswith(' lines, 11 records'))
+    formatted = status.text()
+
+    # fold all and jump to a record, only that record is unfolded
+    py.get('#x-load-raw-data-buffer-fold').click()
+    py.get('#x-load-raw-data-buffer-jump').type('AWS\n')
+    assert wait_until(lambda: find_raw_line(view, '"__id__": "AWS"'))
+    assert find_raw_line(view, '… Amazon (')
+    assert find_raw_line(view, '… DropBox (')
+    time.sleep(DBT)
+
+    # remove the comma at the end of a line, the error line and column are reported
+    line = find_raw_line(view, '"__id__": "AWS"')
+    lnum = int(line.children()[0].text().split()[0])
+    line.children()[1].click() # edit the line
+    view.find('textarea')[0].type(Keys.END, Keys.BACKSPACE, '\n')
+    assert wait_until(lambda: 'invalid JSON' in status.text())
+    assert f'invalid JSON at line {lnum + 1}, column 13:' in status.text()
+    time.sleep(DBT)
+
+    # fix it and change the record id
+    find_raw_line(view, '"__id__": "AWS"').children()[1].click()
+    view.find('textarea')[0].type(Keys.END, Keys.BACKSPACE, ' Console",\n')
+    assert wait_until(lambda: status.text() == formatted)
+    assert find_raw_line(view, '"__id__": "AWS Console",')
+    options = py.get('#x-load-raw-data-buffer-ids').find('option')
+    assert 'AWS Console' in [option.get_attribute('value') for option in options]
+    time.sleep(DBT)
+
+    # backspace at the start of a line joins it to the previous line
+    nlines = int(formatted.split()[0])
+    find_raw_line(view, '"url": "https://aws.amazon.com"').children()[1].click()
+    view.find('textarea')[0].type(Keys.HOME, Keys.BACKSPACE)
+    assert wait_until(lambda: status.text().startswith(f'{nlines - 1} lines,'))
+    joined = find_raw_line(view, '"__id__": "AWS Console",')
+    assert '"url": "https://aws.amazon.com"' in joined.text()
+    view.find('textarea')[0].type(Keys.SHIFT + Keys.ENTER + Keys.NULL, '\n') # split it again
+    assert wait_until(lambda: status.text() == formatted)
+    time.sleep(DBT)
+
+    # ctrl-shift-K deletes a line, add it back
+    find_raw_line(view, '"url": "https://aws.amazon.com"').children()[1].click()
+    view.find('textarea')[0].type(Keys.CONTROL + Keys.SHIFT + 'k' + Keys.NULL)
+    assert wait_until(lambda: status.text().startswith(f'{nlines - 1} lines,'))
+    assert not find_raw_line(view, 'https://aws.amazon.com')
+    view.find('textarea')[0].type(Keys.ESCAPE) # the next line is edited
+    find_raw_line(view, '"__id__": "AWS Console",').children()[1].click()
+    view.find('textarea')[0].type(Keys.END, Keys.SHIFT + Keys.ENTER + Keys.NULL,
+                                  '"url": "https://aws.amazon.com",', '\n')
+    assert wait_until(lambda: status.text() == formatted)
+    time.sleep(DBT)
+
+    # clicking on a folded record edits the whole record, replace it and delete it
+    find_raw_line(view, '… DropBox (').children()[1].click()
+    textarea = view.find('textarea')[0]
+    assert '"__id__": "DropBox"' in textarea.get_attribute('value')
+    textarea.type(Keys.CONTROL + 'a' + Keys.NULL, '{"__id__": "Box", "password": "x"},', '\n')
+    assert wait_until(lambda: find_raw_line(view, '… Box (1 lines)'))
+    assert status.text().endswith(' lines, 11 records')
+    time.sleep(DBT)
+    find_raw_line(view, '… Box (').children()[1].click()
+    view.find('textarea')[0].type(Keys.CONTROL + Keys.SHIFT + 'k' + Keys.NULL)
+    assert wait_until(lambda: status.text().endswith(' lines, 10 records'))
+    view.find('textarea')[0].type(Keys.ESCAPE)
+    assert not find_raw_line(view, 'Box (')
+    edited = status.text()
+    time.sleep(DBT)
+
+    # unfold a record by clicking on the fold marker
+    find_raw_line(view, '… Amazon (').children()[0].click()
+    assert wait_until(lambda: find_raw_line(view, '"__id__": "Amazon"'))
+    assert not find_raw_line(view, '… Amazon (')
+
+    # fold and unfold all
+    py.get('#x-load-raw-data-buffer-fold').click()
+    assert wait_until(lambda: any('…' in line for line in raw_lines(view)))
+    py.get('#x-load-raw-data-buffer-unfold').click()
+    assert wait_until(lambda: not any('…' in line for line in raw_lines(view)))
+
+    # compress and format
+    py.get('#x-load-raw-data-compress').click()
+    assert wait_until(lambda: status.text() == '1 lines, 10 records')
+    time.sleep(DBT)
+    py.get('#x-load-raw-data-format').click()
+    assert wait_until(lambda: status.text() == edited)
+    assert find_raw_line(view, '"meta": {')
+
+    # the records were updated
+    py.get('#x-topmenu-button').click()
+    py.get('#x-menu-content').children()[3].click() # records
+    assert py.get('#x-data-records-div')
+    records = py.get('#x-data-records-div').children()
+    assert len(records) == 10
+    assert any('AWS Console' in record.text() for record in records)
+    assert not any('DropBox' in record.text() for record in records)
+
+
+def test_records(py, url): # pylint: disable=too-many-locals,too-many-statements
     'records'
     # First load the example
-    py.visit(URL)
+    py.visit(url)
     py.get('#x-topmenu-button').click()
     py.get('#x-menu-content').children()[2].click() # load
+    assert py.get('#x-load-content-id') # wait for the load page module
     plist = py.get('#page-load').children()
     plist[1].click() # open panel
     button = plist[1].children()[1].children()[0].children()[1].children()[0]
@@ -383,15 +667,21 @@ def test_records(py): # pylint: disable=too-many-locals,too-many-statements
     assert page.tag_name() == 'div'
     plist = page.children()
     assert len(plist) == 1
-    assert len(topc) == 8
+    assert len(topc) == 11
     expand_button = topc[3]
     collapse_button = topc[4]
     add_button = topc[5]
     nrecs_span = topc[6]
+    breach_button = topc[7]
+    audit_button = topc[8]
+    rotate_button = topc[9]
     assert expand_button.tag_name() == 'button'
     assert collapse_button.tag_name() == 'button'
     assert add_button.tag_name() == 'button'
     assert nrecs_span.tag_name() == 'span'
+    assert breach_button.tag_name() == 'button'
+    assert audit_button.tag_name() == 'button'
+    assert rotate_button.tag_name() == 'button'
 
     # Search box
     search = plist[0].children()[1].children()[0].children()[0]
@@ -406,6 +696,37 @@ def test_records(py): # pylint: disable=too-many-locals,too-many-statements
     records = py.get('#x-data-records-div').children()
     assert len(records) == 11
 
+    # regenerating the passwords requires a search term
+    rotate_button.click()
+    assert 'please enter a search term' in accept_alert(py)
+    assert not expected_conditions.alert_is_present()(py.webdriver) # no confirmation
+    assert len(py.get('#x-data-records-div').children()) == 11
+    time.sleep(DBT)
+
+    # regenerate the password of one record
+    search.type('^AWS$')
+    assert wait_until(lambda: len(py.get('#x-data-records-div').children()) == 1)
+    old = 'hr5Hn9pqm3u.VqMiALfdN-'
+    assert py.get('#x-data-records-div input[type="password"]').get_attribute('value') == old
+    rotate_button.click()
+    assert accept_alert(py).startswith('regenerate 1 passwords in 1 records?')
+
+    def password():
+        return py.get('#x-data-records-div input[type="password"]').get_attribute('value')
+
+    assert wait_until(lambda: password() != old)
+    assert 15 <= len(password()) <= 31  # CRYPTIC_PASSWORD_DEFAULTS
+    assert re.fullmatch(r'[A-Za-z0-9_\-!.]+', password())
+    assert all(re.search(rex, password()) for rex in ('[A-Z]', '[a-z]', '[0-9]', r'[_\-!.]'))
+    time.sleep(DBT)
+
+    # the page was redrawn, clear the search
+    plist = py.get('#page-data').children()
+    plist[0].children()[1].children()[0].children()[1].children()[0].click()
+    assert wait_until(lambda: len(py.get('#x-data-records-div').children()) == 11)
+    add_button = py.get('#x-data-content-id').children()[5]
+    records = py.get('#x-data-records-div').children()
+
     records[0].click() # open
     time.sleep(DBT)
 
@@ -542,9 +863,85 @@ def test_records(py): # pylint: disable=too-many-locals,too-many-statements
     assert panel.children()[1].children()[0].text() == 'https://go-there.com'
 
 
-def test_save(py):
+def test_password_strength(py, url):
+    'password strength meter and breached password check'
+    py.visit(url)
+    py.get('#x-topmenu-button').click()
+    py.get('#x-menu-content').children()[1].click() # preferences
+    assert py.get('#x-prefs-content-id')
+    plist = py.get('#page-prefs').children()
+    plist[1].click() # master password
+    entry = plist[1].children()[1].children()[0].children()[1]
+    meter = entry.get('.x-password-strength')
+    assert meter.tag_name() == 'meter'
+    assert meter.get_attribute('title') == 'password strength'
+
+    # a weak password
+    entry.get('input').type('abc')
+    assert wait_until(lambda: meter.get_attribute('title').startswith('very weak: about '))
+    assert meter.get_attribute('value') == '0'
+    time.sleep(DBT)
+
+    # a cryptic password
+    entry.find('button')[1].click()
+    assert wait_until(lambda: meter.get_attribute('title').startswith(('strong:', 'very strong:')))
+    assert meter.get_attribute('value') in ('3', '4')
+    time.sleep(DBT)
+
+    # the shield button reports that there is no filter
+    if Path(__file__).resolve().parent.parent.joinpath('www/js/breached.bin').exists():
+        return  # the filter was built locally
+    load_example(py)
+    py.get('#x-topmenu-button').click()
+    py.get('#x-menu-content').children()[3].click() # records
+    py.get('#x-data-breach-button').click()
+    assert 'the breached password filter is not available' in accept_alert(py)
+
+
+def test_audit(py, url):
+    'password audit'
+    py.visit(url)
+    load_example(py)
+    py.get('#x-topmenu-button').click()
+    py.get('#x-menu-content').children()[3].click() # records
+    py.get('#x-data-audit-button').click()
+    audit = py.get('#x-data-audit-div')
+    select = audit.find('select')[0]
+
+    def rows():
+        return [row.text() for row in audit.children()[1].children()]
+
+    # the example reuses a password and has a short master password
+    shown = rows()
+    assert len(shown) == 3
+    assert 'Amazon: password - reused by 1 other fields' in shown
+    assert 'AWS: password - reused by 1 other fields' in shown
+    assert any(row.startswith('Master: password - only 7 characters') for row in shown)
+
+    # filter the issues
+    select.select_by_value('short')
+    assert wait_until(lambda: len(rows()) == 1)
+    assert rows()[0].startswith('Master: password')
+    time.sleep(DBT)
+    select.select_by_value('reused')
+    assert wait_until(lambda: sorted(row.split(':')[0] for row in rows()) == ['AWS', 'Amazon'])
+    select.select_by_value('similar')
+    assert wait_until(lambda: rows() == ['No issues found.'])
+    select.select_by_value('')
+    assert wait_until(lambda: len(rows()) == 3)
+
+    # clicking on a finding shows the record
+    audit.children()[1].children()[0].click()
+    assert wait_until(lambda: len(py.get('#x-data-records-div').children()) == 1)
+
+    # the audit view is toggled by the button
+    py.get('#x-data-audit-button').click()
+    assert not py.find('#x-data-audit-div', timeout=1)
+
+
+def test_save(py, url):
     'save'
-    py.visit(URL)
+    py.visit(url)
     assert py.find('#x-topmenu-button')
     py.get('#x-topmenu-button').click()
     py.get('#x-menu-content').children()[4].click() # save
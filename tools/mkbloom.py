@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+'''
+Build the breached password Bloom filter used by the webapp.
+
+The input is one or more local breach corpus files with one password
+per line. Nothing is downloaded.
+
+By default the filter is sized for a target false positive rate p,
+0.1% unless --fpr is specified, and the number of hash functions is
+chosen to minimize the false positive rate:
+
+    m = -n * ln(p) / ln(2) ** 2
+    k = (m / n) * ln(2)
+    p = (1 - exp(-k * n / m)) ** k
+
+where m is the number of bits and n is the number of passwords. That
+is about 1.8 bytes per password, for example 1.7 MiB for 1,000,000
+passwords and 24 MiB for the 14,000,000 passwords in rockyou.txt.
+
+A fixed size can be specified with --budget. If the resulting false
+positive rate is above --max-fpr (1% by default) the filter is not
+written because most passwords would be reported as breached, for
+example a 1 MiB filter has a false positive rate of 1.8% for 1,000,000
+passwords and 82% for 14,000,000 passwords.
+
+The file format is described in www/js/breach_worker.js, the hash
+functions must stay in sync with it.
+
+Usage:
+    python3 tools/mkbloom.py rockyou.txt
+    python3 tools/mkbloom.py --fpr 0.0001 rockyou.txt
+    python3 tools/mkbloom.py --budget 4194304 -o www/js/breached.bin a.txt b.txt
+'''
+import argparse
+import math
+import struct
+import sys
+
+# The default target false positive rate.
+FPR = 0.001
+
+# The default maximum false positive rate for a fixed budget.
+MAX_FPR = 0.01
+
+# The maximum number of bits, the header stores m as a 32 bit integer.
+MAX_BITS = 0xffffffff
+
+# The maximum number of hash functions.
+MAX_K = 16
+
+# The FNV-1a offset bases, they must match www/js/breach_worker.js.
+FNV_BASIS1 = 0x811c9dc5
+FNV_BASIS2 = 0x050c5d1f
+FNV_PRIME = 0x01000193
+
+
+def fnv1a(data: bytes, basis: int) -> int:
+    '''Compute the 32 bit FNV-1a hash.'''
+    hval = basis
+    for byte in data:
+        hval ^= byte
+        hval = (hval * FNV_PRIME) & 0xffffffff
+    return hval
+
+
+def indices(password: str, k: int, m: int):
+    '''Generate the bit indices for a password using double hashing.'''
+    data = password.encode('utf-8')
+    h1 = fnv1a(data, FNV_BASIS1)
+    h2 = fnv1a(data, FNV_BASIS2) | 1
+    for i in range(k):
+        yield (h1 + i * h2) % m
+
+
+def read_passwords(paths):
+    '''Read the unique passwords from the corpus files.'''
+    passwords = set()
+    for path in paths:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as ifp:
+            for line in ifp:
+                password = line.rstrip('\r\n')
+                if password:
+                    passwords.add(password)
+    return passwords
+
+
+def budget_for(n: int, fpr: float) -> int:
+    '''Compute the filter size in bytes for n passwords and a target false positive rate.'''
+    m = -max(n, 1) * math.log(fpr) / math.log(2) ** 2
+    return math.ceil(m / 8)
+
+
+def false_positive_rate(data: bytes) -> float:
+    '''Compute the false positive rate of a filter from its header.'''
+    _, k, _, m, n = struct.unpack('<BBHII', data[4:16])
+    return (1 - math.exp(-k * n / m)) ** k
+
+
+def build(passwords, budget: int) -> bytes:
+    '''Build the filter.'''
+    m = budget * 8
+    n = len(passwords)
+    k = max(1, min(MAX_K, round(m / max(n, 1) * math.log(2))))
+    bits = bytearray(budget)
+    for password in passwords:
+        for j in indices(password, k, m):
+            bits[j >> 3] |= 1 << (j & 7)
+    header = b'MVBF' + struct.pack('<BBHII', 1, k, 0, m, n)
+    return header + bytes(bits)
+
+
+def main():
+    '''main'''
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-b', '--budget', type=int, default=0,
+                        help='the filter size in bytes, the default is to size '
+                        'the filter for the --fpr target')
+    parser.add_argument('-f', '--fpr', type=float, default=FPR,
+                        help='the target false positive rate (default: %(default)s)')
+    parser.add_argument('-m', '--max-fpr', type=float, default=MAX_FPR,
+                        help='the maximum false positive rate allowed for a '
+                        'fixed --budget (default: %(default)s)')
+    parser.add_argument('-o', '--output', default='www/js/breached.bin',
+                        help='the output file (default: %(default)s)')
+    parser.add_argument('corpus', nargs='+',
+                        help='the breach corpus files, one password per line')
+    opts = parser.parse_args()
+    if opts.budget < 0 or opts.budget * 8 > MAX_BITS:
+        sys.exit(f'error: invalid budget {opts.budget}')
+    if not 0 < opts.fpr < 1:
+        sys.exit(f'error: invalid false positive rate {opts.fpr}')
+
+    passwords = read_passwords(opts.corpus)
+    budget = opts.budget or budget_for(len(passwords), opts.fpr)
+    if budget * 8 > MAX_BITS:
+        sys.exit(f'error: {len(passwords):,} passwords need a {budget:,} byte filter '
+                 f'which is too large, use a smaller corpus or a larger --fpr')
+    data = build(passwords, budget)
+    _, k, _, m, n = struct.unpack('<BBHII', data[4:16])
+    fpr = false_positive_rate(data)
+    if opts.budget and fpr > opts.max_fpr:
+        sys.exit(f'error: the false positive rate for {n:,} passwords in {budget:,} bytes '
+                 f'is {fpr:.2%} which is above {opts.max_fpr:.2%}, too many passwords would be '
+                 f'reported as breached, use --budget {budget_for(n, opts.fpr)} or omit '
+                 f'--budget to size the filter for --fpr {opts.fpr}')
+    with open(opts.output, 'wb') as ofp:
+        ofp.write(data)
+    print(f'wrote {opts.output}: {n:,} passwords, {m:,} bits, k={k}, '
+          f'false positive rate={fpr:.4%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,7 @@ import { common, getFieldValueType } from '/js/common.js'
 import { hideAll } from '/js/utils.js'
 import { hideMenu  } from '/js/header.js'
 import { makePasswordEntryWithId } from '/js/password.js'
+import { auditRecord, auditRemoveRecord } from '/js/audit.js'
 import { xmake,
          makeInputXWrapper,
          makeTextButton,
@@ -410,12 +411,15 @@ function createRecord() {
         let ok = confirm('Replace existing record?')
         if (ok) {
             let idx = common.data._map[rid]
+            auditRemoveRecord(common.data.records[idx])
             common.data.records[idx] = rec
+            auditRecord(rec)
         }
     } else {
         let idx = common.data.records.length
         common.data.records.push(rec)
         common.data._map[rid] = idx
+        auditRecord(rec)
     }
     common.data.records.sort((a,b) => {
         let xa = a.__id__.toLowerCase()
@@ -0,0 +1,265 @@
+/**
+ * Audit the record passwords for reuse and weakness.
+ * <p>
+ * The password fields are identified by the <code>common.ftype</code>
+ * rules. Each password is hashed into an index using a hash that is
+ * keyed by random seeds chosen for the session so that the index
+ * never holds the plaintext and the digests cannot be compared across
+ * sessions. Reused passwords are found by grouping equal digests and
+ * near-identical passwords by grouping the digests of a normalized
+ * form so the audit is O(n) in the number of password fields.
+ * <p>
+ * The index is keyed by the record object. Records are replaced, not
+ * modified, when they are edited so the index is updated incrementally
+ * by [auditRecord()]{@link module:audit~auditRecord} and
+ * [auditRemoveRecord()]{@link module:audit~auditRemoveRecord}, and
+ * [auditSync()]{@link module:audit~auditSync} only hashes the records
+ * that it has not seen before.
+ * @module audit
+ */
+import { common, getFieldValueType, getFieldTypesVersion } from '/js/common.js'
+import { estimatePasswordEntropy } from '/js/password.js'
+
+/**
+ * Passwords shorter than this are reported as short.
+ */
+export const AUDIT_MIN_LENGTH = 12
+
+/**
+ * Passwords with fewer estimated bits of entropy than this are
+ * reported as weak.
+ */
+export const AUDIT_MIN_BITS = 36
+
+/**
+ * The audit issue names.
+ */
+export const AUDIT_ISSUES = ['reused', 'similar', 'short', 'weak']
+
+/**
+ * The hash seeds for this session.
+ */
+var seeds = new Uint32Array(4)
+self.crypto.getRandomValues(seeds)
+
+/**
+ * The index.
+ * <ul>
+ *   <li>records: Map record object to its entries.</li>
+ *   <li>exact: Map password digest to the set of entries with that digest.</li>
+ *   <li>similar: Map normalized password digest to the set of entries.</li>
+ *   <li>ftype: The version of the field type rules that were used to build the index.</li>
+ * </ul>
+ */
+var index = {
+    records: new Map(),
+    exact: new Map(),
+    similar: new Map(),
+    ftype: 0,
+}
+
+/**
+ * Compute a 53 bit keyed hash (cyrb53).
+ * @param {string} str The string to hash.
+ * @param {number} seed The 32 bit seed.
+ * @returns {number} The hash.
+ */
+function cyrb53(str, seed) {
+    let h1 = 0xdeadbeef ^ seed
+    let h2 = 0x41c6ce57 ^ seed
+    for (let i = 0; i < str.length; i++) {
+        let ch = str.charCodeAt(i)
+        h1 = Math.imul(h1 ^ ch, 2654435761)
+        h2 = Math.imul(h2 ^ ch, 1597334677)
+    }
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909)
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909)
+    return 4294967296 * (2097151 & h2) + (h1 >>> 0)
+}
+
+/**
+ * Compute the session keyed digest of a string.
+ * <p>
+ * Two independent hashes are combined to make collisions negligible
+ * even for very large vaults.
+ * @param {string} str The string to hash.
+ * @param {number} offset The seed offset, 0 for exact and 2 for normalized digests.
+ * @returns {string} The digest.
+ */
+function digest(str, offset) {
+    return cyrb53(str, seeds[offset]).toString(36) + ':' + cyrb53(str, seeds[offset + 1]).toString(36)
+}
+
+/**
+ * Normalize a password for the near-identical comparison.
+ * <p>
+ * Passwords that only differ by case, digits or symbols, like
+ * "Summer2020!" and "summer2021", are considered near-identical.
+ * @param {string} password The password.
+ * @returns {string} The normalized password or null if too little is left to compare.
+ */
+function normalize(password) {
+    let text = password.toLowerCase().replace(/[^a-z]/g, '')
+    return text.length < 4 ? null : text
+}
+
+/**
+ * Add an entry to a digest group.
+ * @param {Map} groups The groups.
+ * @param {string} key The digest.
+ * @param {object} entry The entry.
+ */
+function addToGroup(groups, key, entry) {
+    let group = groups.get(key)
+    if (!group) {
+        group = new Set()
+        groups.set(key, group)
+    }
+    group.add(entry)
+}
+
+/**
+ * Remove an entry from a digest group.
+ * @param {Map} groups The groups.
+ * @param {string} key The digest.
+ * @param {object} entry The entry.
+ */
+function removeFromGroup(groups, key, entry) {
+    let group = groups.get(key)
+    if (group) {
+        group.delete(entry)
+        if (group.size === 0) {
+            groups.delete(key)
+        }
+    }
+}
+
+/**
+ * Add or update a record in the audit index.
+ * <p>
+ * Call this when a record is created or replaced.
+ * @param {object} rec The record.
+ */
+export function auditRecord(rec) {
+    auditRemoveRecord(rec)
+    let entries = []
+    for (const field of Object.keys(rec)) {
+        let value = rec[field]
+        if (field === '__id__' || !value || getFieldValueType(field) !== 'password') {
+            continue
+        }
+        let norm = normalize(value)
+        let entry = {
+            rec: rec,
+            field: field,
+            exact: digest(value, 0),
+            similar: norm ? digest(norm, 2) : null,
+            length: value.length,
+            bits: estimatePasswordEntropy(value),
+        }
+        addToGroup(index.exact, entry.exact, entry)
+        if (entry.similar) {
+            addToGroup(index.similar, entry.similar, entry)
+        }
+        entries.push(entry)
+    }
+    index.records.set(rec, entries)
+}
+
+/**
+ * Remove a record from the audit index.
+ * <p>
+ * Call this when a record is deleted or replaced.
+ * @param {object} rec The record.
+ */
+export function auditRemoveRecord(rec) {
+    let entries = index.records.get(rec)
+    if (!entries) {
+        return
+    }
+    for (const entry of entries) {
+        removeFromGroup(index.exact, entry.exact, entry)
+        if (entry.similar) {
+            removeFromGroup(index.similar, entry.similar, entry)
+        }
+    }
+    index.records.delete(rec)
+}
+
+/**
+ * Synchronize the audit index with <code>common.data.records</code>.
+ * <p>
+ * Only records that are not in the index are hashed, records that no
+ * longer exist are removed. The index is rebuilt from scratch if the
+ * field type rules changed because that changes which fields are
+ * passwords.
+ */
+export function auditSync() {
+    let ftype = getFieldTypesVersion()
+    if (ftype !== index.ftype) {
+        index.records.clear()
+        index.exact.clear()
+        index.similar.clear()
+        index.ftype = ftype
+    }
+    let current = new Set(common.data.records)
+    for (const rec of index.records.keys()) {
+        if (!current.has(rec)) {
+            auditRemoveRecord(rec)
+        }
+    }
+    for (const rec of common.data.records) {
+        if (!index.records.has(rec)) {
+            auditRecord(rec)
+        }
+    }
+}
+
+/**
+ * Get the audit findings.
+ * @example
+ * for (const finding of auditFindings()) {
+ *     console.log(finding.rid, finding.field, finding.issues.join(', '))
+ * }
+ * @returns {object[]} The findings sorted by record id: {rid, field,
+ * issues, reused, similar, length, bits} where reused and similar are the
+ * number of other fields that share the password or a near-identical one.
+ */
+export function auditFindings() {
+    auditSync()
+    let findings = []
+    for (const entries of index.records.values()) {
+        for (const entry of entries) {
+            // Equal passwords have equal normalized forms so the
+            // exact group is a subset of the similar group.
+            let reused = index.exact.get(entry.exact).size - 1
+            let similar = entry.similar ? index.similar.get(entry.similar).size - reused - 1 : 0
+            let issues = []
+            if (reused) {
+                issues.push('reused')
+            }
+            if (similar) {
+                issues.push('similar')
+            }
+            if (entry.length < AUDIT_MIN_LENGTH) {
+                issues.push('short')
+            }
+            if (entry.bits < AUDIT_MIN_BITS) {
+                issues.push('weak')
+            }
+            if (issues.length) {
+                findings.push({
+                    rid: entry.rec.__id__,
+                    field: entry.field,
+                    issues: issues,
+                    reused: reused,
+                    similar: similar,
+                    length: entry.length,
+                    bits: entry.bits,
+                })
+            }
+        }
+    }
+    findings.sort((a, b) => a.rid.localeCompare(b.rid) || a.field.localeCompare(b.field))
+    return findings
+}
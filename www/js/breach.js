@@ -0,0 +1,114 @@
+/**
+ * Offline breached password checks.
+ * <p>
+ * The passwords are checked against a Bloom filter built from a local
+ * breach corpus, nothing is ever sent to an external service. The
+ * filter is loaded into a worker the first time that a password field
+ * is created so that it never slows down startup and the queries
+ * never block the page.
+ * <p>
+ * A Bloom filter can report false positives but never false negatives
+ * so a password that is not reported is definitely not in the corpus
+ * and a password that is not in the corpus is reported as breached
+ * with the probability of the false positive rate. The filter is sized
+ * for a 0.1% rate by default and it is never built with a rate above
+ * 1%. The rate is reported by the worker.
+ * @module breach
+ */
+
+/**
+ * The worker, created on demand.
+ */
+var worker = null
+
+/**
+ * True if the worker failed, the filter is then not available until
+ * the page is reloaded.
+ */
+var failed = false
+
+/**
+ * The outstanding requests: {id: resolve}.
+ */
+var pending = {}
+
+/**
+ * The next request id.
+ */
+var nextId = 0
+
+/**
+ * The filter information reported by the worker: {n, m, k, fpr}.
+ * It is null until the first reply or if the filter is not available.
+ */
+export var breachFilterInfo = null
+
+/**
+ * Start the worker that loads the breached password filter.
+ * <p>
+ * It is safe to call this more than once.
+ */
+export function loadBreachFilter() {
+    if (worker || failed) {
+        return
+    }
+    worker = new Worker('/js/breach_worker.js', {type: 'module'})
+    worker.onmessage = (e) => {
+        breachFilterInfo = e.data.info
+        let resolve = pending[e.data.id]
+        delete pending[e.data.id]
+        if (resolve) {
+            resolve(e.data.results)
+        }
+    }
+    worker.onerror = (e) => {
+        console.log(`breached password worker failed: ${e.message}`)
+        // Nothing more will be reported, later requests resolve at once.
+        failed = true
+        breachFilterInfo = null
+        worker.terminate()
+        worker = null
+        let waiting = pending
+        pending = {}
+        for (const resolve of Object.values(waiting)) {
+            resolve(null)
+        }
+    }
+    let id = nextId++
+    pending[id] = () => {}
+    worker.postMessage({id: id, passwords: []}) // start loading the filter
+}
+
+/**
+ * Check a batch of passwords.
+ * @example
+ * checkPasswords(['password', 'E7f-!qzP.b2x']).then((results) => {
+ *     assert results[0] === true
+ *     assert results[1] === false
+ * })
+ * @param {string[]} passwords The passwords to check.
+ * @returns {Promise} An array of results, one per password: true if it
+ * was probably breached, false if it was not or null if the filter is
+ * not available.
+ */
+export function checkPasswords(passwords) {
+    loadBreachFilter()
+    if (failed) {
+        return Promise.resolve(passwords.map(() => null))
+    }
+    return new Promise((resolve) => {
+        let id = nextId++
+        pending[id] = (results) => resolve(results || passwords.map(() => null))
+        worker.postMessage({id: id, passwords: passwords})
+    })
+}
+
+/**
+ * Check a single password.
+ * @param {string} password The password to check.
+ * @returns {Promise} True if it was probably breached, false if it
+ * was not or null if the filter is not available.
+ */
+export function checkPassword(password) {
+    return checkPasswords([password]).then((results) => results[0])
+}
@@ -0,0 +1,142 @@
+/*jshint worker: true */
+/**
+ * The worker that checks passwords against the breached password filter.
+ * <p>
+ * The filter is a Bloom filter built from a local breach corpus by
+ * <code>tools/mkbloom.py</code>. It is fetched once and queried
+ * directly from the downloaded buffer without any parsing or copying.
+ * <p>
+ * The filter format is a 16 byte header followed by the bit array.
+ * All integers are little endian.
+ *
+ * | offset | size | description |
+ * | ------ | ---- | ----------- |
+ * | 0      | 4    | magic: "MVBF" |
+ * | 4      | 1    | format version: 1 |
+ * | 5      | 1    | k: the number of hash functions |
+ * | 6      | 2    | reserved |
+ * | 8      | 4    | m: the number of bits |
+ * | 12     | 4    | n: the number of passwords |
+ *
+ * The bit indices are computed by double hashing the UTF-8 encoded
+ * password with two FNV-1a hashes: <code>(h1 + i*h2) % m</code>.
+ * This must stay in sync with <code>tools/mkbloom.py</code>.
+ * @module breach_worker
+ */
+
+/**
+ * The location of the filter.
+ */
+const FILTER_URL = '/js/breached.bin'
+
+/**
+ * The filter size of the header in bytes.
+ */
+const HEADER_SIZE = 16
+
+/**
+ * The FNV-1a offset basis for the first hash.
+ */
+const FNV_BASIS1 = 0x811c9dc5
+
+/**
+ * The FNV-1a offset basis for the second hash.
+ */
+const FNV_BASIS2 = 0x050c5d1f
+
+/**
+ * The filter promise, resolved to null if the filter is not available.
+ */
+var filter = null
+
+/**
+ * Compute the 32 bit FNV-1a hash.
+ * @param {Uint8Array} bytes The data to hash.
+ * @param {number} basis The offset basis.
+ * @returns {number} The unsigned 32 bit hash.
+ */
+function fnv1a(bytes, basis) {
+    let h = basis
+    for (let i = 0; i < bytes.length; i++) {
+        h ^= bytes[i]
+        h = Math.imul(h, 0x01000193)
+    }
+    return h >>> 0
+}
+
+/**
+ * Load the filter.
+ * @returns {Promise} The filter object or null if it is not available.
+ */
+function loadFilter() {
+    return fetch(FILTER_URL)
+        .then((response) => response.ok ? response.arrayBuffer() : null)
+        .then((buffer) => {
+            if (!buffer || buffer.byteLength < HEADER_SIZE) {
+                return null
+            }
+            let view = new DataView(buffer)
+            let magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4))
+            if (magic !== 'MVBF' || view.getUint8(4) !== 1) {
+                console.log(`invalid breached password filter: ${FILTER_URL}`)
+                return null
+            }
+            let k = view.getUint8(5)
+            let m = view.getUint32(8, true)
+            let n = view.getUint32(12, true)
+            if (buffer.byteLength < HEADER_SIZE + Math.ceil(m / 8)) {
+                console.log(`truncated breached password filter: ${FILTER_URL}`)
+                return null
+            }
+            return {
+                k: k,
+                m: m,
+                n: n,
+                fpr: Math.pow(1 - Math.exp(-k * n / m), k),
+                bits: new Uint8Array(buffer, HEADER_SIZE),
+            }
+        })
+        .catch((e) => {
+            console.log(`cannot load breached password filter: ${e}`)
+            return null
+        })
+}
+
+/**
+ * Is the password in the filter?
+ * @param {object} f The filter.
+ * @param {TextEncoder} encoder The UTF-8 encoder.
+ * @param {string} password The password.
+ * @returns {boolean} True if it is probably breached, false if it is definitely not.
+ */
+function contains(f, encoder, password) {
+    let bytes = encoder.encode(password)
+    let h1 = fnv1a(bytes, FNV_BASIS1)
+    let h2 = (fnv1a(bytes, FNV_BASIS2) | 1) >>> 0
+    for (let i = 0; i < f.k; i++) {
+        let j = (h1 + i * h2) % f.m
+        if ((f.bits[j >>> 3] & (1 << (j & 7))) === 0) {
+            return false
+        }
+    }
+    return true
+}
+
+/**
+ * Handle a request.
+ * <p>
+ * The request is <code>{id, passwords}</code>, the reply is
+ * <code>{id, results, info}</code> where each result is true, false
+ * or null if the filter is not available.
+ */
+self.onmessage = (e) => {
+    if (!filter) {
+        filter = loadFilter()
+    }
+    filter.then((f) => {
+        let encoder = new TextEncoder()
+        let results = e.data.passwords.map((p) => f ? contains(f, encoder, p) : null)
+        let info = f ? {n: f.n, m: f.m, k: f.k, fpr: f.fpr} : null
+        self.postMessage({id: e.data.id, results: results, info: info})
+    })
+}
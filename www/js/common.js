@@ -103,6 +103,7 @@ export var common = {
     },
     icons: { // Credit to ico moon free icons: https://icomoon.io/preview-free.html
         arrowDown: '/icons/arrow-down.svg',
+        audit: '/icons/stats-bars.svg',
         arrowLeft: '/icons/arrow-left.svg',
         arrowRight: '/icons/arrow-right.svg',
         arrowUp: '/icons/arrow-up.svg',
@@ -134,6 +135,7 @@ export var common = {
         reset: '/icons/loop2.svg',
         save: '/icons/download.svg',
         search: '/icons/search.svg',
+        shield: '/icons/shield.svg',
         shrink: '/icons/shrink.svg',
         trash: '/icons/bin.svg',
         undo: '/icons/undo2.svg',
@@ -158,6 +160,10 @@ export var common = {
  * memorable passwords.
  * The mapping between field names and types is defined in
  *  the common.ftype map.
+ * <p>
+ * The map is compiled into a single regular expression the first
+ * time it is used after it changes and the results are cached by
+ * field name because the same names are used in most records.
  * @example
  * assert getFieldValueType('password') == 'password'
  * assert getFieldValueType('My Password') == 'password'
@@ -170,14 +176,131 @@ export var common = {
  * @returns {string} The type of field as a string.
  */
 export function getFieldValueType(name) {
-    // (O(N) is okay because the list is very short.
+    if (fieldTypes.ftype !== common.ftype) {
+        compileFieldTypes()
+    }
+    let type = fieldTypes.cache.get(name)
+    if (type === undefined) {
+        type = 'string'
+        let m = fieldTypes.match ? fieldTypes.match.exec(name) : null
+        if (m) {
+            type = fieldTypes.types[fieldTypes.groups.findIndex((g) => m[g] !== undefined)]
+        }
+        fieldTypes.cache.set(name, type)
+    }
+    return type
+}
+
+/**
+ * The compiled field name to type classifier.
+ * <ul>
+ *   <li>ftype: The common.ftype array it was compiled from.</li>
+ *   <li>version: Incremented each time it is compiled.</li>
+ *   <li>match: The combined regular expression.</li>
+ *   <li>groups: The capture group of each entry in the combined expression.</li>
+ *   <li>types: The type of each entry.</li>
+ *   <li>cache: Map field name to type.</li>
+ * </ul>
+ */
+var fieldTypes = {
+    ftype: null,
+    version: 0,
+    match: null,
+    groups: [],
+    types: [],
+    cache: new Map(),
+}
+
+/**
+ * The field value types.
+ */
+export const FIELD_VALUE_TYPES = ['string', 'password', 'textarea']
+
+/**
+ * Check a field name value type map entry.
+ * @example
+ * assert checkFieldType({rex: 'pin', type: 'password'}) === null
+ * assert checkFieldType({rex: 'pin'}) !== null
+ * @param {object} obj The entry: {rex, type}.
+ * @returns {string} Why the entry is not valid or null if it is valid.
+ */
+export function checkFieldType(obj) {
+    if (!obj || typeof obj !== 'object' || Array.isArray(obj)) {
+        return 'the entry is not a {rex, type} object'
+    }
+    if (typeof obj.rex !== 'string') {
+        return 'rex is not a string'
+    }
+    if (!FIELD_VALUE_TYPES.includes(obj.type)) {
+        return `type is not one of: ${FIELD_VALUE_TYPES.join(', ')}`
+    }
+    try {
+        RegExp(obj.rex, 'i')
+    } catch (e) {
+        return `invalid regular expression: ${e}`
+    }
+    // Backreferences and named groups cannot be combined safely.
+    if (/\\[1-9]|\(\?<[^=!]/.test(obj.rex)) {
+        return 'backreferences and named groups are not supported'
+    }
+    return null
+}
+
+/**
+ * Compile the common.ftype entries into a single case insensitive
+ * regular expression.
+ * <p>
+ * Each entry is a lookahead with a capture group that is tried at
+ * the start of the name so the first entry that matches anywhere in
+ * the name wins, exactly like testing them one at a time. Entries
+ * that are not valid are ignored, see checkFieldType().
+ */
+function compileFieldTypes() {
+    let parts = []
+    let group = 1
+    fieldTypes.groups = []
+    fieldTypes.types = []
     for (const obj of common.ftype) {
-        let rex = new RegExp(obj.rex, 'i')
-        if ( name.search(rex) >= 0 ) {
-            return obj.type
+        let error = checkFieldType(obj)
+        if (error) {
+            console.log(`ignoring invalid field type entry: ${JSON.stringify(obj)}: ${error}`)
+            continue
         }
+        let rex = new RegExp(obj.rex + '|', 'i')
+        parts.push(`(?=[\\s\\S]*?(${obj.rex}))`)
+        fieldTypes.groups.push(group)
+        fieldTypes.types.push(obj.type)
+        group += rex.exec('').length  // the entry group and its own groups
+    }
+    fieldTypes.match = parts.length ? new RegExp(`^(?:${parts.join('|')})`, 'i') : null
+    fieldTypes.ftype = common.ftype
+    fieldTypes.version++
+    fieldTypes.cache.clear()
+}
+
+/**
+ * Recompile the field name to type classifier.
+ * <p>
+ * Call this when the common.ftype entries are changed in place. A new
+ * common.ftype array, like the one restored from the session storage,
+ * is detected automatically.
+ */
+export function updateFieldTypes() {
+    fieldTypes.ftype = null
+}
+
+/**
+ * Get the version of the field name to type classifier.
+ * <p>
+ * It changes whenever the classifier is recompiled, so anything that
+ * was derived from the field types must be recomputed.
+ * @returns {number} The version.
+ */
+export function getFieldTypesVersion() {
+    if (fieldTypes.ftype !== common.ftype) {
+        compileFieldTypes()
     }
-    return 'string'
+    return fieldTypes.version
 }
 
 /**
@@ -255,7 +378,7 @@ export function restoreCommon() {
                 common.themes.active.prop = jdata.themes.active.prop
                 common.themes.props = jdata.themes.props
             }
-            common.icons = jdata.icons
+            common.icons = {...common.icons, ...jdata.icons} // keep icons added since the save
         } catch(e) {
             alert(`cannot parse session store\nerror: ${e}`)
         }
@@ -2,7 +2,7 @@
  * Show the data records.
  * @module records
  */
-import { common, getFieldValueType } from '/js/common.js'
+import { common } from '/js/common.js'
 import { makeIcon, changeIcon } from '/js/icons.js'
 import { hideMenu  } from '/js/header.js'
 import { hideAll,
@@ -10,7 +10,7 @@ import { hideAll,
          makeInputXWrapper,
          makeTextButton,
          makeIconButton,
-         isURL,
+         getRecordViewModel,
          statusMsg,
        } from '/js/utils.js'
 import { expandAccordion,
@@ -21,6 +21,9 @@ import { expandAccordion,
          makeAccordionEntry } from '/js/accordion.js'
 import { addRecord } from '/js/add.js'
 import { editRecord } from '/js/edit.js'
+import { checkPasswords, breachFilterInfo } from '/js/breach.js'
+import { auditFindings, auditRecord, auditRemoveRecord, AUDIT_ISSUES } from '/js/audit.js'
+import { generateCrypticPasswords } from '/js/password.js'
 
 /**
  * The grid label style, populated by the theme.
@@ -124,6 +127,42 @@ function makeViewPage(top) {
                 .xStyle({marginLeft: '5px'})
                 .xId('x-records-length')
                 .xInnerHTML(getNumVisibleRecs()),
+            xmake('button')
+                .xStyle(
+                    {
+                        backgroundColor: common.themes._activeColors().bgColor,
+                        color: common.themes._activeColors().fgColor,
+                        marginLeft: '5px'
+                    })
+                .xAddClass('x-theme-element')
+                .xTooltip('check all record passwords against the offline breached password list')
+                .xId('x-data-breach-button')
+                .xAddEventListener('click', () => checkAllRecords())
+                .xAppendChild(makeIcon(common.icons.shield, 'check')),
+            xmake('button')
+                .xStyle(
+                    {
+                        backgroundColor: common.themes._activeColors().bgColor,
+                        color: common.themes._activeColors().fgColor,
+                        marginLeft: '5px'
+                    })
+                .xAddClass('x-theme-element')
+                .xTooltip('show or hide the password audit: reused, near-identical, short and weak passwords')
+                .xId('x-data-audit-button')
+                .xAddEventListener('click', () => toggleAuditView())
+                .xAppendChild(makeIcon(common.icons.audit, 'audit')),
+            xmake('button')
+                .xStyle(
+                    {
+                        backgroundColor: common.themes._activeColors().bgColor,
+                        color: common.themes._activeColors().fgColor,
+                        marginLeft: '5px'
+                    })
+                .xAddClass('x-theme-element')
+                .xTooltip('regenerate the passwords of the records that match the search')
+                .xId('x-data-rotate-button')
+                .xAddEventListener('click', () => rotateVisiblePasswords())
+                .xAppendChild(makeIcon(common.icons.reset, 'rotate')),
         )
     top.xAppendChild(accordion)
     makeRecordEntries(accordion)
@@ -185,7 +224,6 @@ Please load records or create the records manually by clicking the "plus" button
     // create each entry
     for(let i=0; i<common.data.records.length; i++) {
         let rec = common.data.records[i]
-        let text = JSON.stringify(rec,null,4)
         let rid = rec.__id__ // the accordion entry title is the record __id__
         let xid = 'x-record-view-container-' + i
 
@@ -200,13 +238,12 @@ Please load records or create the records manually by clicking the "plus" button
 
         // Create the key/value fields
         let idx = 0
-        for(const key of Object.keys(rec)) {
-            let value = rec[key]
+        for(const field of getRecordViewModel(rec).fields) {
             idx += 1
-            if ( key === '__id__' ) { // skip the title
+            if ( field.key === '__id__' ) { // skip the title
                 continue
             }
-            makeRecordViewEntry(i, idx, div, key, value)
+            makeRecordViewEntry(i, idx, div, field)
         }
 
         // Add the edit/trash buttons at the bottom.
@@ -231,6 +268,7 @@ Please load records or create the records manually by clicking the "plus" button
                                    'Delete',
                                    common.icons.trash,
                                    (e) => { // jshint ignore:line
+                                       auditRemoveRecord(common.data.records[i]) // jshint ignore:line
                                        common.data.records.splice(i, 1) // jshint ignore:line
                                        showDataPage()
                                    }),
@@ -247,6 +285,205 @@ Please load records or create the records manually by clicking the "plus" button
     document.getElementById('x-records-length').innerHTML = getNumVisibleRecs()
 }
 
+/**
+ * Check the passwords in all of the records against the offline
+ * breached password filter and report the records that have
+ * breached passwords.
+ */
+function checkAllRecords() {
+    let fields = []
+    let passwords = []
+    for (const rec of common.data.records) {
+        for (const field of getRecordViewModel(rec).fields) {
+            if (field.key !== '__id__' && field.value && field.ftype === 'password') {
+                fields.push(`${rec.__id__}: ${field.key}`)
+                passwords.push(field.value)
+            }
+        }
+    }
+    if (passwords.length === 0) {
+        statusMsg('no passwords to check')
+        return
+    }
+    checkPasswords(passwords).then((results) => {
+        if (!breachFilterInfo) {
+            alert('cannot check passwords\nthe breached password filter is not available')
+            return
+        }
+        let found = fields.filter((f, i) => results[i])
+        let fpr = (100 * breachFilterInfo.fpr).toFixed(2)
+        if (found.length === 0) {
+            alert(`none of the ${passwords.length} passwords were found in the breached password list`)
+        } else {
+            alert(`found ${found.length} of ${passwords.length} passwords in the breached password list ` +
+                  `(false positive rate ${fpr}%):\n` + found.join('\n'))
+        }
+    })
+}
+
+/**
+ * The maximum number of audit findings to display at once.
+ */
+const MAX_AUDIT_ROWS = 500
+
+/**
+ * Show or hide the password audit view.
+ * <p>
+ * The view lists the password fields with issues and can be filtered
+ * by issue. Clicking on an entry shows the record.
+ */
+function toggleAuditView() {
+    let aid = 'x-data-audit-div'
+    let adiv = document.getElementById(aid)
+    if (adiv) {
+        adiv.remove()
+        return
+    }
+    let start = performance.now()
+    let findings = auditFindings()
+    let elapsed = Math.round(performance.now() - start)
+
+    let list = xmake('div').xStyle({textAlign: 'left'})
+    let select = xmake('select')
+        .xStyle({
+            backgroundColor: common.themes._activeColors().bgColor,
+            color: common.themes._activeColors().fgColor,
+            marginLeft: '5px'})
+        .xAddClass('x-theme-element')
+        .xAddEventListener('change', (e) => showAuditFindings(list, findings, e.target.value))
+    select.xAppendChild(xmake('option').xAttr('value', '').xInnerHTML(`all issues (${findings.length})`))
+    for (const issue of AUDIT_ISSUES) {
+        let num = findings.filter((f) => f.issues.includes(issue)).length
+        select.xAppendChild(xmake('option').xAttr('value', issue).xInnerHTML(`${issue} (${num})`))
+    }
+
+    adiv = xmake('div')
+        .xId(aid)
+        .xStyle(common.themes._activeProp().general.text)
+        .xAddClass('x-theme-element')
+        .xAppendChild(
+            xmake('p')
+                .xInnerHTML(`Audited ${common.data.records.length} records in ${elapsed}ms.`)
+                .xAppendChild(select),
+            list)
+    showAuditFindings(list, findings, '')
+    document.getElementById('x-data-content-id')
+        .insertBefore(adiv, document.getElementById('x-data-records-div'))
+}
+
+/**
+ * Show the audit findings for an issue.
+ * @param {element} list The findings container.
+ * @param {object[]} findings The audit findings.
+ * @param {string} issue The issue to show or an empty string for all issues.
+ */
+function showAuditFindings(list, findings, issue) {
+    list.xRemoveChildren()
+    let shown = issue ? findings.filter((f) => f.issues.includes(issue)) : findings
+    if (shown.length === 0) {
+        list.xAppendChild(xmake('p').xInnerHTML('No issues found.'))
+        return
+    }
+    for (const finding of shown.slice(0, MAX_AUDIT_ROWS)) {
+        let details = []
+        if (finding.reused) {
+            details.push(`reused by ${finding.reused} other fields`)
+        }
+        if (finding.similar) {
+            details.push(`similar to ${finding.similar} other fields`)
+        }
+        if (finding.issues.includes('short')) {
+            details.push(`only ${finding.length} characters`)
+        }
+        if (finding.issues.includes('weak')) {
+            details.push(`about ${Math.round(finding.bits)} bits`)
+        }
+        let row = xmake('div')
+            .xStyle({cursor: 'pointer'})
+            .xAddClass('x-hover')
+            .xTooltip('click to show the record')
+            .xAddEventListener('click', () => {
+                let search = document.getElementById('x-data-search')
+                search.value = '^' + finding.rid.replace(/[.*+?^${}()|[\]\\]/g, '\\$&') + '$'
+                updateSearch()
+            })
+        row.textContent = `${finding.rid}: ${finding.field} - ${details.join(', ')}`
+        list.xAppendChild(row)
+    }
+    if (shown.length > MAX_AUDIT_ROWS) {
+        list.xAppendChild(xmake('p').xInnerHTML(`... and ${shown.length - MAX_AUDIT_ROWS} more.`))
+    }
+}
+
+/**
+ * Regenerate the passwords of all of the records that match the search.
+ * <p>
+ * A search term is required so that the records are always selected
+ * explicitly, an empty search would otherwise select every record.
+ * <p>
+ * All of the new passwords are generated in a single batch call and
+ * each changed record is replaced by a new record object so that the
+ * audit index is updated incrementally.
+ */
+function rotateVisiblePasswords() {
+    let e = document.getElementById('x-data-search')
+    let filterString = e ? e.value.trim() : ''
+    if (filterString.length === 0) {
+        alert('please enter a search term to select the records whose passwords should be regenerated')
+        return
+    }
+    let regexp = null
+    try {
+        regexp = new RegExp(filterString, 'i')
+    } catch (exc) {
+        alert(`invalid search expresion: "${filterString}"\nregexp:${exc}`)
+        return
+    }
+    let targets = []
+    let count = 0
+    for (let i=0; i<common.data.records.length; i++) {
+        let rec = common.data.records[i]
+        if (!rec.__id__.match(regexp)) {
+            continue
+        }
+        let fields = getRecordViewModel(rec).fields
+            .filter(f => f.key !== '__id__' && f.value && f.ftype === 'password')
+            .map(f => f.key)
+        if (fields.length) {
+            targets.push({idx: i, fields: fields})
+            count += fields.length
+        }
+    }
+    if (count === 0) {
+        statusMsg('no passwords to regenerate')
+        return
+    }
+    if (!confirm(`regenerate ${count} passwords in ${targets.length} records?\nthe old passwords cannot be recovered`)) {
+        return
+    }
+    let passwords
+    try {
+        passwords = generateCrypticPasswords(count)
+    } catch (exc) {
+        alert(`cannot generate passwords\n${exc}`)
+        return
+    }
+    let j = 0
+    for (const target of targets) {
+        let old = common.data.records[target.idx]
+        let rec = {...old}
+        for (const field of target.fields) {
+            rec[field] = passwords[j++]
+        }
+        auditRemoveRecord(old)
+        common.data.records[target.idx] = rec
+        auditRecord(rec)
+    }
+    common.data.mtime = new Date().toISOString()
+    showDataPage()
+    statusMsg(`regenerated ${count} passwords in ${targets.length} records`)
+}
+
 /**
  * Get the regex for the search constraints from the search input element.
  * @returns {RegExp} The search regular expression.
@@ -297,20 +534,16 @@ function getNumVisibleRecs() {
  * @param {number} ridx The record index in common.data.records[].
  * @param {number} idx The record field index.
  * @param {element} div The parent element of the this entry.
- * @param {string} key The field label value.
- * @param {string} value The field value.
+ * @param {object} field The field from the record view model: {key, value, ftype, url}.
  */
 // make record entry
-function makeRecordViewEntry(ridx, idx, div, key, value) {
+function makeRecordViewEntry(ridx, idx, div, field) {
     let pid = 'x-data-record-password-key-' + ridx + '-' + idx
     let bid = pid + '-button'
-    let ftype = getFieldValueType(key)
-    if (ftype === 'string') {
-        // check for the special case where the value is a URL
-        if (isURL(value)) {
-            ftype = 'url'
-        }
-    }
+    let key = field.key
+    let value = field.value
+    // the special case where a string value is a URL
+    let ftype = field.url ? 'url' : field.ftype
     let label = xmake('div')
             .xStyle(gridLabelStyle)
             .xAppendChild(
@@ -3,17 +3,19 @@
  * the user clicks the edit button.
  * @module edit
 */
-import { common, getFieldValueType } from '/js/common.js'
+import { common } from '/js/common.js'
 import { xmake,
          makeTextButton,
          makeIconButton,
          isURL,
+         getRecordViewModel,
          deepCopyObject,
          makeInputXWrapper,
        } from '/js/utils.js'
 import { makePasswordEntryWithId } from '/js/password.js'
 import { showDataPage } from '/js/data.js'  // TODO: hate this circular dependency
 import { fieldNameHandler } from '/js/add.js'  // TODO: hate this circular dependency
+import { auditRecord, auditRemoveRecord } from '/js/audit.js'
 
 /**
  * The grid label style, populated by the theme.
@@ -143,7 +145,9 @@ function saveData( mid, idx) {
             return xa.localeCompare(xb)
         })
     }
+    auditRemoveRecord(common.data.records[idx])
     common.data.records[idx] = rec
+    auditRecord(rec)
     common.data.mtime = new Date().toISOString()
     showDataPage()
 }
@@ -182,10 +186,11 @@ function createField(numFields, xid, idx, fid, rec) {
     let vid = 'x-data-field-value-'+ fid
     let kcls = 'x-data-field-key-element'
     let vcls = 'x-data-field-value-element'
-    let fkey = Object.keys(rec)[fid]
+    let field = getRecordViewModel(rec).fields[fid]
+    let fkey = field.key
     let fname = fkey
-    let fvalue = rec[fkey] || ''
-    let ftype = getFieldValueType(fkey)
+    let fvalue = field.value || ''
+    let ftype = field.ftype
     let key = xmake('div')
         .xStyle(gridLabelStyle)
         .xAppendChild(
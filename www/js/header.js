@@ -7,12 +7,83 @@
 import { xmake, hideAll } from '/js/utils.js'
 import { makeIcon, changeIcon } from '/js/icons.js'
 import { common } from '/js/common.js'
-import { showPrefsPage } from '/js/prefs.js'
-import { showLoadPage } from '/js/load.js'
-import { showDataPage } from '/js/data.js'
-import { showSavePage } from '/js/save.js'
 import { showAboutPage } from '/js/about.js'
 
+/**
+ * The page modules that are loaded on demand.
+ * <p>
+ * Each entry defines the loader, the name of the function that
+ * displays the page and the page that the user is most likely to
+ * visit next which is prefetched when the browser is idle.
+ * <p>
+ * The loaders must use literal paths so that the webapp target in the
+ * Makefile can relocate them.
+ * The about page is not here because it is the splash page so it is
+ * always loaded at startup.
+ */
+var pages = {
+    prefs: {load: () => import('/js/prefs.js'), show: 'showPrefsPage', next: 'data'},
+    load: {load: () => import('/js/load.js'), show: 'showLoadPage', next: 'data'},
+    data: {load: () => import('/js/data.js'), show: 'showDataPage', next: 'save'},
+    save: {load: () => import('/js/save.js'), show: 'showSavePage', next: null},
+}
+
+/**
+ * The module promises for the pages that have been requested.
+ * They are cached so that each module is only fetched once.
+ */
+var pageModules = {}
+
+/**
+ * Load a page module on demand.
+ * @example
+ * loadPage('prefs').then((m) => m.showPrefsPage())
+ * @param {string} name The page name: prefs, load, data or save.
+ * @returns {Promise} The promise for the page module.
+ */
+export function loadPage(name) {
+    if (!(name in pageModules)) {
+        pageModules[name] = pages[name].load().catch((e) => {
+            delete pageModules[name] // allow it to be retried
+            throw e
+        })
+    }
+    return pageModules[name]
+}
+
+/**
+ * Prefetch a page module when the browser is idle.
+ * <p>
+ * This hides the load latency for the page that the user
+ * is most likely to choose next.
+ * @param {string} name The page name, ignored if it is null or already loaded.
+ */
+export function prefetchPage(name) {
+    if (!name || name in pageModules) {
+        return
+    }
+    let fetch = () => loadPage(name).catch((e) => console.log(`prefetch ${name} failed: ${e}`))
+    if ('requestIdleCallback' in window) {
+        window.requestIdleCallback(fetch, {timeout: 2000})
+    } else {
+        setTimeout(fetch, 200)
+    }
+}
+
+/**
+ * Show a page, loading its module first if necessary.
+ * @param {string} name The page name: prefs, load, data or save.
+ * @param {event} e The click event.
+ */
+function showPage(name, e) {
+    loadPage(name)
+        .then((m) => {
+            m[pages[name].show](e)
+            prefetchPage(pages[name].next)
+        })
+        .catch((err) => alert(`cannot load the ${name} page\nerror: ${err}`))
+}
+
 /**
  * Create the header and append it to the document body.
  * The CSS styles for the header are defined by the theme.
@@ -69,19 +140,19 @@ export function header() {
                         makeMenuEntry('modify preferences',
                                       'Preferences',
                                       common.icons.cog,
-                                      showPrefsPage),
+                                      (e) => showPage('prefs', e)),
                         makeMenuEntry('load the password database records',
                                      'Load',
                                       common.icons.list,
-                                      showLoadPage),
+                                      (e) => showPage('load', e)),
                         makeMenuEntry('view or modify the password data records',
                                       'Records',
                                       common.icons.db,
-                                      showDataPage),
+                                      (e) => showPage('data', e)),
                         makeMenuEntry('save the records to the vault',
                                       'Save',
                                       common.icons.save,
-                                      showSavePage),
+                                      (e) => showPage('save', e)),
                     )
             )
     )
@@ -126,19 +197,19 @@ export function header() {
    makeMenuEntry('modify preferences',
      'Preferences',
      common.icons.cog,
-     showPrefsPage),
+     (e) => showPage('prefs', e)),
    makeMenuEntry('load the password database records',
      'Load',
      common.icons.list,
-     showLoadPage),
+     (e) => showPage('load', e)),
    makeMenuEntry('view or modify the password data records',
     'Records',
     common.icons.db,
-    showDataPage),
+    (e) => showPage('data', e)),
    makeMenuEntry('save the records to the vault',
     'Save',
     common.icons.save,
-    showSavePage),
+    (e) => showPage('save', e)),
   )
   * @param {string} tooltip The tooltip for the menu item.
   * @param {string} title The menu item text.
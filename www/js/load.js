@@ -17,6 +17,10 @@ import { expandAccordion,
          accordionPanelImgClass,
          accordionPanelButtonClass,
          makeAccordionEntry } from '/js/accordion.js'
+import { makeRawEditor,
+         getRawEditorText,
+         setRawEditorText,
+         formatRawEditor } from '/js/rawedit.js'
 
 /**
  * Show the load page.
@@ -209,46 +213,28 @@ View or change the raw data that was loaded by the previous options.
 This is useful for debugging or entering data manually.
 If there is no data, reload the data.
 `),
-                xmake('textarea')
-                    .xStyle({
-                        backgroundColor: common.themes._activeColors().bgColor,
-                        color: common.themes._activeColors().fgColor,
-                        width: common.themes._activeProp().textareaColor,
-                    })
-                    .xStyle(common.themes._activeProp().general.textarea)
-                    .xAddClass('x-theme-element')
-                    .xAttr('rows', '10')
-                    .xAttr('placeholder', 'Raw Data')
-                    .xId(eid)
-                    .xAddEventListener('input', () => {
-                        let text = document.getElementById(eid).value
-                        document.getElementById(eidlen).innerHTML = text.length
-                        setRawData(text)
-                    })
-                    .xAddEventListener('paste', () => {
-                        navigator.clipboard.readText().then( text => {
-                            document.getElementById(eid).value = text
-                            document.getElementById(eidlen).innerHTML = text.length
-                            setRawData(text)
-                        })
-                    })
-                    .xAddEventListener('change', () => {
-                        let text = document.getElementById(eid).value
-                        document.getElementById(eidlen).innerHTML = text.length
-                        setRawData(text)
-                    }),
+                makeRawEditor(eid, {
+                    rows: 10,
+                    placeholder: 'Raw Data',
+                    onChange: (text) => setRawData(text),
+                    onUpdate: (info) => {
+                        let e = document.getElementById(eidlen)
+                        if (e) {
+                            e.innerHTML = info.length
+                        }
+                    },
+                }),
                 xmake('div').xStyle({marginTop: '10px'}),
                 makeIconButton('clear the raw data', 'clear',  common.icons.clear, () => {
-                    document.getElementById(eid).value = ''
-                    document.getElementById(eidlen).innerHTML = '0'
+                    setRawEditorText(eid, '')
                     setRawData('')
                 }),
                 makeIconButton('copy to clipboard', 'copy', common.icons.copy, () => {
-                    let text = document.getElementById(eid).value
+                    let text = getRawEditorText(eid)
                     navigator.clipboard.writeText(text)
                 }),
                 makeIconButton('encrypt using master password', 'encrypt', common.icons.lock, (e) => {
-                    let text = document.getElementById(eid).value.trim()
+                    let text = getRawEditorText(eid).trim()
                     if (text.length === 0) {
                         alert('nothing to encrypt')
                     } else {
@@ -259,12 +245,12 @@ If there is no data, reload the data.
                             let enc = common.crypt._wasm.encrypt(common.crypt.algorithm, common.crypt.password, text)
                             //setRawData(enc)
                             setRawData(text)
-                            document.getElementById(eid).value = enc
+                            setRawEditorText(eid, enc)
                         }
                     }
                 }),
                 makeIconButton('decrypt using master password', 'decrypt', common.icons.unlock, (e) => {
-                    let text = document.getElementById(eid).value.trim()
+                    let text = getRawEditorText(eid).trim()
                     if (text.length === 0) {
                         alert('nothing to decrypt')
                     } else {
@@ -277,33 +263,23 @@ If there is no data, reload the data.
                     }
                 }),
                 makeIconButton('save raw data and use internally', 'save', common.icons.save, (e) => {
-                    let text = document.getElementById(eid).value
+                    let text = getRawEditorText(eid)
                     setRawData(text)
                 }),
                 makeIconButton('format JSON', 'format', common.icons.expand, (e) => {
-                    let text = document.getElementById(eid).value
-                    let json = null
-                    try {
-                        json = JSON.parse(text)
-                    } catch(event) {
-                        alert(`cannot format, invalid JSON\nerror: ${ event }`)
-                        return
-                    }
-                    let x  = JSON.stringify(json, null, 4)
-                    setRawData(x)
-                }),
+                    formatRawEditor(eid, false).then((ok) => {
+                        if (ok) {
+                            setRawData(getRawEditorText(eid))
+                        }
+                    })
+                }).xId('x-load-raw-data-format'),
                 makeIconButton('unformat JSON', 'compress', common.icons.shrink, (event) => {
-                    let text = document.getElementById(eid).value
-                    let json = null
-                    try {
-                        json = JSON.parse(text)
-                    } catch(exc) {
-                        alert(`cannot compress, invalid JSON\nerror: ${ exc }`)
-                        return
-                    }
-                    let x = JSON.stringify(json)
-                    setRawData(x)
-                }),
+                    formatRawEditor(eid, true).then((ok) => {
+                        if (ok) {
+                            setRawData(getRawEditorText(eid))
+                        }
+                    })
+                }).xId('x-load-raw-data-compress'),
                 xmake('span')
                     .xStyle({marginLeft: '5px'})
                     .xId(eidlen)
@@ -424,11 +400,11 @@ function setRawData(text) {
         common.data.maxFields = getObjectValue(rec, common.data.maxFields, 'data', 'maxFields')
         common.save.filename = getObjectValue(rec, common.save.filename, 'filename')
 
-        // update the raw data text box
+        // update the raw data viewer unless the text came from it
         let eid = 'x-load-raw-data-buffer'
-        let eidlen = 'x-load-raw-data-buffer-length'
-        document.getElementById(eid).value = text
-        document.getElementById(eidlen).innerHTML = text.length
+        if (getRawEditorText(eid).trim() !== text) {
+            setRawEditorText(eid, text)
+        }
         header()
     }
 }
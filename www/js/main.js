@@ -4,7 +4,7 @@
  * @module main
 */
 import { xmake, enableFunctionChaining, statusMsg } from '/js/utils.js'
-import { header  } from '/js/header.js'
+import { header, prefetchPage } from '/js/header.js'
 import { common, displayTheme, saveCommon, restoreCommon } from '/js/common.js'
 import { showAboutPage } from '/js/about.js'
 
@@ -28,6 +28,7 @@ enableFunctionChaining()
 /**
  * Load the Rust encryption/decryption algorithms from WebAssembly.
  * It updates the common.crypt fields.
+ * @returns {Promise} Resolved when the WebAssembly module is ready.
  */
 async function loadCrypt() {
     await init()
@@ -41,9 +42,24 @@ async function loadCrypt() {
         header_suffix: header_suffix, // header_suffix(algorithm: string) -> string
     }
     common.crypt._wasm = fcts
-    restoreCommon()
 }
-loadCrypt()
+
+/**
+ * Wait until the document has been parsed so that the body is available.
+ * <p>
+ * Module scripts are deferred so this normally resolves immediately
+ * but it does not hurt to be sure.
+ * @returns {Promise} Resolved when the document body is available.
+ */
+function documentReady() {
+    return new Promise((resolve) => {
+        if (document.readyState === 'loading') {
+            document.addEventListener('DOMContentLoaded', () => resolve())
+        } else {
+            resolve()
+        }
+    })
+}
 
 /**
  * When the window is closed make sure that the state is saved.
@@ -57,23 +73,33 @@ window.addEventListener('beforeunload', () => {
 })
 
 /**
- * Actions to take when the window is loaded.
- * @global
+ * The application startup pipeline.
+ * <p>
+ * The stages are run in a fixed order so that there are no races:
+ * <ol>
+ *   <li>WASM init: load the encryption algorithms, in parallel with document parsing.</li>
+ *   <li>State restore: restore the session state, it needs the algorithms.</li>
+ *   <li>First paint: display the about page.</li>
+ * </ol>
+ * The page modules are not loaded at startup, they are loaded when
+ * they are first chosen from the menu or prefetched when the browser
+ * is idle.
  */
-window.onload = () => { main() }
+async function startup() {
+    await Promise.all([loadCrypt(), documentReady()])
+    restoreCommon()
+    main()
+    prefetchPage('load') // the page most likely to be chosen first
+}
+startup().catch((e) => alert(`cannot start the application\nerror: ${e}`))
 
 /**
  * Main entry point for the application.
  * <p>
- * It sets up a bunch of stuff which takes a bit of time so it assumes
- * that
- * [loadCrypt()]{@link module:main~loadCrypt}.
- * is complete which obviates the need for a
- * document.readyState check.
- * <p>
- * If race problem is ever observed, the logic
- * should be modified so that main() is called by
- * but since this works there is no reason to change it.
+ * It creates the page containers and displays the initial splash
+ * page. It is the last stage of the
+ * [startup()]{@link module:main~startup} pipeline so
+ * the crypt functions and the session state are always available.
  */
 function main() {
     header()
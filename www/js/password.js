@@ -6,57 +6,69 @@ import { xmake, makeInputXWrapper, statusMsg } from '/js/utils.js'
 import { makeIcon, changeIcon } from '/js/icons.js'
 import { words } from '/js/en_words.js'
 import { common } from '/js/common.js'
+import { loadBreachFilter, checkPassword } from '/js/breach.js'
+import { generate_passwords } from '/js/crypt.js'
 
 /**
- * Internal utility function to generate a cryptic password composed
- * of letters, digits and special characters.
+ * The default cryptic password options.
+ * <p>
+ * The required character classes guarantee that each generated
+ * password has at least one character from each class.
+ */
+export const CRYPTIC_PASSWORD_DEFAULTS = {
+    alphabet: 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-!.',
+    minlen: 15,
+    maxlen: 31,
+    required: ['ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz', '0123456789', '_-!.'],
+}
+
+/**
+ * Generate a batch of cryptic passwords composed of letters, digits
+ * and special characters.
+ * <p>
+ * The passwords are generated by the crypt WASM module in a single
+ * call using unbiased rejection sampling over the operating system
+ * random number generator so it is cheap to generate thousands of
+ * passwords at once.
+ * @example
+ * let passwords = generateCrypticPasswords(1000, {minlen: 20, maxlen: 20})
+ * assert passwords.length == 1000
+ * assert passwords[0].length == 20
+ * @param {number} count The number of passwords to generate.
+ * @param {object} opts The password options object, see
+ * [CRYPTIC_PASSWORD_DEFAULTS]{@link module:password~CRYPTIC_PASSWORD_DEFAULTS}.
+ * Missing options take the default values.
+ * @returns {string[]} The generated passwords.
+ * @throws {Error} If the options are not valid.
+ */
+export function generateCrypticPasswords(count, opts) {
+    let o = {...CRYPTIC_PASSWORD_DEFAULTS, ...opts}
+    if (count === 0) {
+        return []
+    }
+    let result = generate_passwords(o.alphabet, o.minlen, o.maxlen, o.required.join('\n'), count)
+    if (result.startsWith('error:')) {
+        throw new Error(result)
+    }
+    return result.split('\n')
+}
+
+/**
+ * Generate a cryptic password composed of letters, digits and special
+ * characters.
  * @example
  * password1 = generateCrypticPassword()
  * password2 = generateCrypticPassword({minlen: 64, maxlen: 64})
- * asssert password2.length == 62
+ * asssert password2.length == 64
  * asssert password2.length > password1.length
  * @param {object} opts The password options object.
- * It defines the alphabet, the minimum length (minlen) and maximum length (maxlen) of
- * the password that is to be generated. The default minimum length is 15
- * and the maximum length is 31.
+ * It defines the alphabet, the minimum length (minlen), the maximum length (maxlen)
+ * and the required character classes (required) of the password that is
+ * to be generated. The default minimum length is 15 and the maximum length is 31.
  * @returns {string} The generated password.
  */
 export function generateCrypticPassword(opts) {
-    function getval(prop, defval) {
-        if (!opts) {
-            return defval
-        }
-        if (opts.hasOwnProperly(prop)) {
-            return opts.minlen
-        }
-        return defval
-    }
-    let alphabet = getval('alphabet', "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-!.");
-    let size = alphabet.length;
-    let result = '';
-    let minlen = getval('minval', 15)
-    let maxlen = getval('maxval', 31)
-
-    // Add a touch more randomness.
-    var num_rounds = Math.floor(Math.random() * (100));
-    for (let j=0; j < num_rounds; j++) {
-        var length = Math.floor(Math.random() * (maxlen - minlen)) + minlen;
-        let array;
-        if ('Uint8Array' in self && 'crypto' in self) {
-            array = new Uint8Array(length);
-            self.crypto.getRandomValues(array);
-        } else {
-            array = new Array(length);
-            for (let i = 0; i < length; i++) {
-                array[i] = Math.floor(Math.random() * 62);
-            }
-        }
-        result = '';  // reset each round
-        for (let i=0; i < length; i++) {
-            result += alphabet.charAt(array[i] % size);
-        }
-    }
-    return result;
+    return generateCrypticPasswords(1, opts)[0]
 }
 
 /**
@@ -112,6 +124,77 @@ export function generateMemorablePassword() {
     }
     return result;
 }
+
+/**
+ * Estimate the entropy of a password in bits.
+ * <p>
+ * This is a simple character pool estimate: the length times the
+ * log2 of the size of the character classes used where repeated
+ * characters only count for a quarter. It does not know about words
+ * so it overestimates memorable passwords, which is why known
+ * breached passwords are checked separately.
+ * @example
+ * assert estimatePasswordEntropy('') == 0
+ * assert estimatePasswordEntropy('aaaa') < estimatePasswordEntropy('abcd')
+ * @param {string} password The password.
+ * @returns {number} The estimated entropy in bits.
+ */
+export function estimatePasswordEntropy(password) {
+    let pool = 0
+    if (/[a-z]/.test(password)) {
+        pool += 26
+    }
+    if (/[A-Z]/.test(password)) {
+        pool += 26
+    }
+    if (/[0-9]/.test(password)) {
+        pool += 10
+    }
+    if (/[^a-zA-Z0-9]/.test(password)) {
+        pool += 33
+    }
+    if (pool === 0) {
+        return 0
+    }
+    let unique = new Set(password).size
+    let length = unique + (password.length - unique) / 4
+    return length * Math.log2(pool)
+}
+
+/**
+ * The password strength labels indexed by score.
+ */
+const STRENGTH_LABELS = ['very weak', 'weak', 'fair', 'strong', 'very strong']
+
+/**
+ * Rate the strength of a password.
+ * @example
+ * assert passwordStrength('abc').label == 'very weak'
+ * assert passwordStrength('abc', true).score == 0 // breached
+ * @param {string} password The password.
+ * @param {boolean} breached True if the password is known to be breached.
+ * @returns {object} The strength: {bits, score, label} where the score is 0 (very weak) to 4 (very strong).
+ */
+export function passwordStrength(password, breached) {
+    let bits = estimatePasswordEntropy(password)
+    let score = 4
+    if (bits < 28) {
+        score = 0
+    } else if (bits < 36) {
+        score = 1
+    } else if (bits < 60) {
+        score = 2
+    } else if (bits < 100) {
+        score = 3
+    }
+    let label = STRENGTH_LABELS[score]
+    if (breached) {
+        score = 0
+        label = 'breached'
+    }
+    return {bits: bits, score: score, label: label}
+}
+
 // ========================================================================
 //
 // DOM Setup
@@ -133,6 +216,7 @@ export function generateMemorablePassword() {
  */
 export function makePasswordEntry(placeholder, getter, setter) {
     let value = getter() || ''
+    loadBreachFilter()
     return xmake('div')
         .xStyle(common.themes._activeProp().password.topdiv)
         .xAppendChild(
@@ -157,6 +241,7 @@ export function makePasswordEntry(placeholder, getter, setter) {
                 .xStyle({marginLeft: '5px'})
                 .xAddClass('x-password-length')
                 .xInnerHTML(value.length),
+            makeStrengthMeter(value),
             xmake('button')
                 .xStyle({
                     backgroundColor: common.themes._activeColors().bgColor,
@@ -227,6 +312,7 @@ export function makePasswordEntry(placeholder, getter, setter) {
  * @returns {element} The DOM element that contains the password input elements.
  */
 export function makePasswordEntryWithId(eid, cls, placeholder,  value) {
+    loadBreachFilter()
     return xmake('div')
         .xStyle(common.themes._activeProp().password.topdiv)
         .xAppendChild(
@@ -253,6 +339,7 @@ export function makePasswordEntryWithId(eid, cls, placeholder,  value) {
                 .xStyle({marginLeft: '5px'})
                 .xAddClass('x-password-length')
                 .xInnerHTML(value.length),
+            makeStrengthMeter(value),
             xmake('button')
                 .xStyle({
                     backgroundColor: common.themes._activeColors().bgColor,
@@ -291,6 +378,58 @@ export function makePasswordEntryWithId(eid, cls, placeholder,  value) {
                 .xAppendChild(makeIcon(common.icons.copy, 'copy').xAddClass('x-show-hide-img')))
 }
 
+/**
+ * The last password checked for each strength meter.
+ * <p>
+ * It is used to ignore stale breach check results and to skip
+ * redundant checks. It is deliberately not stored in the DOM so that
+ * the password cannot be read from the meter element.
+ */
+const meterPasswords = new WeakMap()
+
+/**
+ * Make the password strength meter.
+ * <p>
+ * The meter shows the estimated strength immediately and is then
+ * updated when the breached password check completes.
+ * @param {string} value The initial password value.
+ * @returns {element} The meter element.
+ */
+function makeStrengthMeter(value) {
+    let meter = xmake('meter')
+        .xStyle({marginLeft: '5px', width: '4em'})
+        .xAddClass('x-password-strength')
+        .xAttr('min', 0)
+        .xAttr('max', 4)
+        .xAttr('low', 2)
+        .xAttr('high', 3)
+        .xAttr('optimum', 4)
+    updatePasswordStrength(meter, value)
+    return meter
+}
+
+/**
+ * Update the password strength meter.
+ * @param {element} meter The meter element.
+ * @param {string} value The password.
+ */
+function updatePasswordStrength(meter, value) {
+    let show = (breached) => {
+        let strength = passwordStrength(value, breached)
+        meter.value = value.length ? strength.score : 0
+        meter.title = value.length ? `${strength.label}: about ${Math.round(strength.bits)} bits` : 'password strength'
+    }
+    show(false)
+    if (value.length) {
+        checkPassword(value).then((breached) => {
+            if (breached && meterPasswords.get(meter) === value) {
+                show(true)
+            }
+        })
+    }
+    meterPasswords.set(meter, value) // ignore stale results
+}
+
 /**
  * Helper function that displays the password length based on password event.
  * @param {event} event A DOM event.
@@ -301,6 +440,10 @@ function updatePasswordLength(event) {
     let input = div.parentNode.getElementsByClassName('x-password-input')[0]
     let span = div.parentNode.getElementsByClassName('x-password-length')[0]
     span.innerHTML = input.value.length
+    let meter = div.parentNode.getElementsByClassName('x-password-strength')[0]
+    if (meter && meterPasswords.get(meter) !== input.value) {
+        updatePasswordStrength(meter, input.value)
+    }
 }
 
 /**
@@ -3,7 +3,7 @@
  * @module preferences
  */
 // The preferences page
-import { common, displayTheme, TITLE, restoreCommon, resetCommon, updateRecordsMap } from '/js/common.js'
+import { common, displayTheme, TITLE, restoreCommon, resetCommon, updateRecordsMap, updateFieldTypes, checkFieldType } from '/js/common.js'
 import { themes } from '/js/themes.js'
 import { makeIcon, changeIcon } from '/js/icons.js'
 import { hideAll,
@@ -19,6 +19,11 @@ import { expandAccordion,
          accordionPanelImgClass,
          accordionPanelButtonClass,
          makeAccordionEntry } from '/js/accordion.js'
+import { makeRawEditor,
+         getRawEditorText,
+         validateRawEditor,
+         formatRawEditor,
+         describeError } from '/js/rawedit.js'
 
 /**
  * The grid label style, populated by the theme.
@@ -458,7 +463,20 @@ insensitive regular expresssions.
                                 alert(`cannot save, invalid JSON\nerror: ${ e }`)
                                 return
                             }
-                            common.data.rfts = rec
+                            if (!Array.isArray(rec)) {
+                                alert('cannot save, the field types must be a list of {rex, type} entries')
+                                return
+                            }
+                            for (let i = 0; i < rec.length; i++) {
+                                let error = checkFieldType(rec[i])
+                                if (error) {
+                                    alert(`cannot save, invalid entry ${ i }: ${ JSON.stringify(rec[i]) }\nerror: ${ error }`)
+                                    return
+                                }
+                            }
+                            common.ftype = rec
+                            updateFieldTypes()
+                            statusMsg('field types saved')
                         }),
                         xmake('span')
                             .xId(eidlen)
@@ -650,83 +668,58 @@ Edit the raw preferences data. This is not for the faint of heart.  It
 can break the program because it allows full access to the internals.
 `),
                 xmake('br'),
-                xmake('textarea')
-                    .xStyle(
-                        {
-                            display: 'grid',
-                            gridTemplateColumns: 'max-content auto', // label value
-                            backgroundColor: common.themes._activeColors().bgColor,
-                            color: common.themes._activeColors().fgColor,
-                            marginTop: '5px'})
-                    .xStyle(common.themes._activeProp().general.textarea)
-                    .xAddClass('x-theme-element')
-                    .xAttr('rows', '10')
-                    .xAttr('placeholder', 'record field templates JSON')
-                    .xId(eid)
-                    .xInnerHTML(text),
+                makeRawEditor(eid, {
+                    text: text,
+                    rows: 10,
+                    placeholder: 'preferences JSON',
+                    onUpdate: (info) => {
+                        let e = document.getElementById(eidlen)
+                        if (e) {
+                            e.innerHTML = info.length
+                        }
+                    },
+                }),
                 xmake('br'),
                 xmake('div')
                     .xStyle({marginTop: '5px'})
                     .xAppendChild(
                         makeIconButton('save', 'save', common.icons.pencil, () => {
-                            let text = document.getElementById(eid).value
-                            let rec = null
-                            try {
-                                rec = JSON.parse(text)
-                            } catch(e) {
-                                alert(`cannot save, invalid JSON\nerror: ${ e }`)
-                                return
-                            }
-                            for (const key of Object.keys(rec)) {
-                                if (key === 'crypt' ) {
-                                    continue // user cannot change the crypt stuff
+                            validateRawEditor(eid).then((error) => {
+                                if (error) {
+                                    alert(`cannot save, invalid JSON\nerror: ${ describeError(error) }`)
+                                    return
                                 }
-                                if (key === 'themes') {
-                                    // do not overwrite the internal fields.
-                                    for(const k in ['active', 'props', 'colors']) {
-                                        if (k in rec[key]) {
-                                            common[key][k] = rec[key][k]
+                                let rec = JSON.parse(getRawEditorText(eid).trim() || '{}')
+                                for (const key of Object.keys(rec)) {
+                                    if (key === 'crypt' ) {
+                                        continue // user cannot change the crypt stuff
+                                    }
+                                    if (key === 'themes') {
+                                        // do not overwrite the internal fields.
+                                        for(const k in ['active', 'props', 'colors']) {
+                                            if (k in rec[key]) {
+                                                common[key][k] = rec[key][k]
+                                            }
                                         }
+                                        continue
                                     }
-                                    continue
+                                    common[key] = rec[key]
                                 }
-                                common[key] = rec[key]
-                            }
-                            updateRecordsMap()
-                            statusMsg('raw edit data saved')
-
+                                updateRecordsMap()
+                                statusMsg('raw edit data saved')
+                            })
                         }).xId('x-prefs-raw-edit-save'),
                         makeIconButton('copy to clipboard', 'copy', common.icons.copy, () => {
-                            let text = document.getElementById(eid).value
+                            let text = getRawEditorText(eid)
                             navigator.clipboard.writeText(text).then((text) => {}, () => {
                                 alert('internal error: clipboard copy operation failed')})
                             statusMsg(`copied ${text.length} bytes`)
                         }),
                         makeIconButton('format JSON', 'format', common.icons.expand, (e) => {
-                            let text = document.getElementById(eid).value
-                            let json = null
-                            try {
-                                json = JSON.parse(text)
-                            } catch (event) {
-                                alert(`cannot format, invalid JSON\nerror: ${ event }`)
-                                return
-                            }
-                            let x  = JSON.stringify(json, null, 4)
-                            document.getElementById(eid).value = x
-                            document.getElementById(eidlen).innerHTML = x.length
+                            formatRawEditor(eid, false)
                         }),
                         makeIconButton('unformat JSON', 'compress', common.icons.shrink, (e) => {
-                            let text = document.getElementById(eid).value
-                            let json = null
-                            try {
-                                json = JSON.parse(text)
-                            } catch (event) {
-                                alert(`cannot compress, invalid JSON\nerror: ${ event }`)
-                                return
-                            }
-                            let x  = JSON.stringify(json)
-                            document.getElementById(eidlen).innerHTML = x.length
-                            document.getElementById(eid).value = x
+                            formatRawEditor(eid, true)
                         }),
                         xmake('span')
                             .xId(eidlen)
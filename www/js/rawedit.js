@@ -0,0 +1,669 @@
+/**
+ * The raw JSON data viewer and editor.
+ * <p>
+ * The raw data can be several megabytes so it is not put in a
+ * textarea. The document is kept as an array of lines and only the
+ * lines that are visible in the scroll window are rendered. A line
+ * is edited by clicking on it, the change is committed by pressing
+ * enter or by moving away from it. Shift-enter inserts a new line,
+ * backspace at the start of a line joins it to the previous line and
+ * ctrl-shift-K (cmd-shift-K on macOS) deletes it. Clicking on a folded
+ * record edits the whole record so it can be replaced or deleted.
+ * <p>
+ * The document is validated and formatted by a worker
+ * (see <code>rawedit_worker.js</code>) so the page never blocks.
+ * The worker only re-parses the lines that changed and reports the
+ * exact line and column of the first error. It also reports where
+ * each record starts and ends so that records can be folded and
+ * found by their <code>__id__</code>.
+ * @module rawedit
+ */
+import { common } from '/js/common.js'
+import { xmake, makeIconButton, statusMsg } from '/js/utils.js'
+
+/**
+ * The height of a line in pixels.
+ */
+const LINE_HEIGHT = 18
+
+/**
+ * The maximum number of characters of a line that are displayed.
+ * Longer lines, like compressed JSON, are truncated in the view but
+ * not when they are edited.
+ */
+const MAX_LINE_CHARS = 2000
+
+/**
+ * The editors by element id.
+ */
+var editors = {}
+
+/**
+ * Create a raw data editor.
+ * <p>
+ * The returned element contains the search and fold controls, the
+ * scroll window with the lines and the status line. The controls have
+ * ids derived from the editor id: -jump, -fold, -unfold and -status.
+ * @example
+ * top.xAppendChild(makeRawEditor('x-raw', {text: '{}', onChange: (text) => use(text)}))
+ * setRawEditorText('x-raw', '{"a": 1}')
+ * let text = getRawEditorText('x-raw')
+ * @param {string} id The element id of the scroll window, it is used to refer to the editor.
+ * @param {object} opts The options: text, the initial text; rows,
+ * the number of visible rows; placeholder, the text to show when the
+ * document is empty; onChange(text), called when the user changed the
+ * text and it is valid JSON or pasted new text; onUpdate(info), called with {lines,
+ * length, error} when the worker reports.
+ * @returns {element} The editor element.
+ */
+export function makeRawEditor(id, opts) {
+    if (editors[id]) {
+        // The page was rendered again, release the old editor.
+        editors[id].worker.terminate()
+        editors[id].resize.disconnect()
+    }
+    let ed = {
+        id: id,
+        opts: opts,
+        lines: [''],
+        rows: [0], // the line shown by each visible row
+        folds: [], // [start, end, __id__]
+        foldByStart: new Map(),
+        folded: new Set(), // the start lines of the folded records
+        error: null,
+        highlight: -1,
+        editing: null,
+        busy: 0,
+        pending: {},
+        nextId: 0,
+        lastSet: 0, // the id of the last set request
+    }
+    editors[id] = ed
+    ed.worker = new Worker('/js/rawedit_worker.js', {type: 'module'})
+    ed.worker.onmessage = (e) => reply(ed, e.data)
+    ed.worker.onerror = (e) => {
+        console.log(`raw data worker failed: ${e.message}`)
+        // Nothing more will be reported, release the waiting requests.
+        let error = {line: 0, col: 0, message: `internal error: ${e.message}`}
+        let pending = ed.pending
+        ed.pending = {}
+        ed.busy = 0
+        for (const resolve of Object.values(pending)) {
+            resolve(error)
+        }
+    }
+
+    let colors = common.themes._activeColors()
+    ed.spacer = xmake('div')
+    ed.window = xmake('div').xStyle({position: 'absolute', left: '0', right: '0', top: '0'})
+    ed.view = xmake('div')
+        .xStyle(common.themes._activeProp().general.textarea)
+        .xStyle({
+            position: 'relative',
+            height: `${(opts.rows || 10) * LINE_HEIGHT}px`,
+            overflow: 'auto',
+            textAlign: 'left',
+            whiteSpace: 'pre',
+            lineHeight: `${LINE_HEIGHT}px`,
+            border: '1px solid',
+            backgroundColor: colors.bgColor,
+            color: colors.fgColor,
+        })
+        .xAddClass('x-theme-element')
+        .xAttr('tabindex', '0')
+        .xId(id)
+        .xAppendChild(ed.spacer, ed.window)
+        .xAddEventListener('scroll', () => scheduleRender(ed))
+        .xAddEventListener('paste', (e) => {
+            if (ed.editing) {
+                return // paste into the line being edited
+            }
+            // Pasting replaces the document, it may be encrypted so
+            // it is passed on even if it is not valid JSON.
+            e.preventDefault()
+            let text = e.clipboardData.getData('text')
+            setRawEditorText(id, text)
+            if (opts.onChange) {
+                opts.onChange(text)
+            }
+        })
+    ed.status = xmake('div')
+        .xId(id + '-status')
+        .xStyle({textAlign: 'left', width: '90%', cursor: 'pointer', marginTop: '2px'})
+        .xAddEventListener('click', () => {
+            if (ed.error) {
+                jumpToLine(ed, ed.error.line)
+            }
+        })
+    ed.ids = xmake('datalist').xId(id + '-ids')
+    let search = xmake('input')
+        .xAttr('type', 'text')
+        .xAttr('list', id + '-ids')
+        .xAttr('placeholder', 'jump to record __id__')
+        .xId(id + '-jump')
+        .xStyle({backgroundColor: colors.bgColor, color: colors.fgColor, marginRight: '5px'})
+        .xAddClass('x-theme-element')
+        .xAddEventListener('change', (e) => jumpToRecord(ed, e.target.value))
+    let top = xmake('div')
+        .xAppendChild(
+            xmake('div')
+                .xStyle({marginBottom: '4px'})
+                .xAppendChild(
+                    search,
+                    ed.ids,
+                    makeIconButton('fold all records', 'fold', common.icons.collapse, () => foldAll(ed, true))
+                        .xId(id + '-fold'),
+                    makeIconButton('unfold all records', 'unfold', common.icons.expand, () => foldAll(ed, false))
+                        .xId(id + '-unfold'),
+                ),
+            ed.view,
+            ed.status)
+    // The view has no size until its accordion panel is opened.
+    ed.resize = new ResizeObserver(() => scheduleRender(ed))
+    ed.resize.observe(ed.view)
+    setRawEditorText(id, opts.text || '')
+    return top
+}
+
+/**
+ * Replace the text in an editor.
+ * @param {string} id The editor id.
+ * @param {string} text The new text.
+ * @returns {Promise} Resolved when the text has been validated.
+ */
+export function setRawEditorText(id, text) {
+    let ed = editors[id]
+    if (!ed) {
+        return Promise.resolve(null)
+    }
+    cancelEdit(ed)
+    ed.lines = text.split('\n')
+    ed.folded.clear()
+    ed.highlight = -1
+    ed.error = null
+    ed.view.scrollTop = 0
+    updateRows(ed)
+    ed.lastSet = ed.nextId
+    return request(ed, {op: 'set', text: text})
+}
+
+/**
+ * Get the text in an editor.
+ * <p>
+ * A line that is being edited is committed first.
+ * @param {string} id The editor id.
+ * @returns {string} The text or an empty string if the editor does not exist.
+ */
+export function getRawEditorText(id) {
+    let ed = editors[id]
+    if (!ed) {
+        return ''
+    }
+    commitEdit(ed)
+    return ed.lines.join('\n')
+}
+
+/**
+ * Validate the text in an editor.
+ * <p>
+ * If it is not valid, the error line is shown.
+ * @param {string} id The editor id.
+ * @returns {Promise} The error {line, col, message} or null if the text is valid.
+ */
+export function validateRawEditor(id) {
+    let ed = editors[id]
+    if (!ed) {
+        return Promise.resolve(null)
+    }
+    commitEdit(ed)
+    return request(ed, {op: 'status'}).then((error) => {
+        if (error) {
+            jumpToLine(ed, error.line)
+        }
+        return error
+    })
+}
+
+/**
+ * Format or compress the JSON in an editor.
+ * <p>
+ * The formatting is done by the worker. Once the text has been
+ * formatted, only the records that were changed are formatted again.
+ * @param {string} id The editor id.
+ * @param {boolean} compress Compress the text instead of formatting it.
+ * @returns {Promise} True if the text was formatted, false if it is not valid.
+ */
+export function formatRawEditor(id, compress) {
+    let ed = editors[id]
+    if (!ed) {
+        return Promise.resolve(false)
+    }
+    commitEdit(ed)
+    ed.busy++
+    return request(ed, {op: 'format', indent: compress ? 0 : 4}).then((error) => {
+        ed.busy--
+        if (error) {
+            alert(`cannot ${compress ? 'compress' : 'format'}, invalid JSON\nerror: ${describeError(error)}`)
+            jumpToLine(ed, error.line)
+            return false
+        }
+        return true
+    })
+}
+
+/**
+ * Describe an error for the user.
+ * @param {object} error The error {line, col, message}.
+ * @returns {string} The description with one based line and column numbers.
+ */
+export function describeError(error) {
+    return `line ${error.line + 1}, column ${error.col + 1}: ${error.message}`
+}
+
+/**
+ * Send a request to the worker.
+ * @param {object} ed The editor.
+ * @param {object} req The request.
+ * @returns {Promise} The error reported by the worker.
+ */
+function request(ed, req) {
+    return new Promise((resolve) => {
+        req.id = ed.nextId++
+        ed.pending[req.id] = resolve
+        ed.worker.postMessage(req)
+    })
+}
+
+/**
+ * Handle a worker reply.
+ * @param {object} ed The editor.
+ * @param {object} rep The reply {id, lines, length, error, folds, splices}.
+ */
+function reply(ed, rep) {
+    let resolve = ed.pending[rep.id]
+    delete ed.pending[rep.id]
+    if (rep.id < ed.lastSet) {
+        resolve(rep.error)
+        return // the text was replaced after this request
+    }
+    for (const change of rep.splices) {
+        ed.lines = replaceLines(ed.lines, change.start, change.deleteCount, change.insert)
+    }
+    if (rep.splices.length) {
+        ed.folded.clear()
+    }
+    ed.error = rep.error
+    ed.folds = rep.folds
+    ed.foldByStart = new Map(rep.folds.map((f) => [f[0], f]))
+    for (const start of ed.folded) {
+        if (!ed.foldByStart.has(start)) {
+            ed.folded.delete(start)
+        }
+    }
+    // Only rebuild the record list when the ids change, it can be long.
+    let ids = rep.folds.map((f) => f[2]).filter((x) => x !== null).join('\n')
+    if (ids !== ed.idList) {
+        ed.idList = ids
+        ed.ids.xRemoveChildren()
+        for (const rid of new Set(ids ? ids.split('\n') : [])) {
+            ed.ids.xAppendChild(xmake('option').xAttr('value', rid))
+        }
+    }
+    updateRows(ed)
+    if (ed.error) {
+        ed.status.textContent = `${rep.lines} lines, invalid JSON at ${describeError(ed.error)}`
+    } else {
+        ed.status.textContent = `${rep.lines} lines, ${rep.folds.length} records`
+    }
+    if (ed.opts.onUpdate) {
+        ed.opts.onUpdate({lines: rep.lines, length: rep.length, error: rep.error})
+    }
+    resolve(rep.error)
+}
+
+/**
+ * Replace lines, see the worker for why this is not just splice().
+ * @param {string[]} lines The lines.
+ * @param {number} start The first line to replace.
+ * @param {number} deleteCount The number of lines to replace.
+ * @param {string[]} insert The new lines.
+ * @returns {string[]} The changed lines.
+ */
+function replaceLines(lines, start, deleteCount, insert) {
+    if (insert.length < 1000) {
+        lines.splice(start, deleteCount, ...insert)
+        return lines
+    }
+    return lines.slice(0, start).concat(insert, lines.slice(start + deleteCount))
+}
+
+/**
+ * Replace lines in an editor and tell the worker.
+ * @param {object} ed The editor.
+ * @param {number} start The first line to replace.
+ * @param {number} deleteCount The number of lines to replace.
+ * @param {string[]} insert The new lines.
+ */
+function editLines(ed, start, deleteCount, insert) {
+    ed.lines = replaceLines(ed.lines, start, deleteCount, insert)
+    // Shift the records after the change until the worker reports.
+    let delta = insert.length - deleteCount
+    let shift = (n) => n > start ? n + delta : n
+    if (ed.lines.length === 0) {
+        ed.lines = [''] // the worker does the same
+    }
+    ed.folds = ed.folds.map((f) => [shift(f[0]), Math.max(shift(f[1]), shift(f[0])), f[2]])
+    ed.foldByStart = new Map(ed.folds.map((f) => [f[0], f]))
+    ed.folded = new Set([...ed.folded].map(shift))
+    updateRows(ed)
+    request(ed, {op: 'edit', start: start, deleteCount: deleteCount, insert: insert}).then((error) => {
+        if (!error) {
+            changed(ed)
+        }
+    })
+}
+
+/**
+ * Report a change by the user.
+ * @param {object} ed The editor.
+ */
+function changed(ed) {
+    if (ed.opts.onChange && !ed.error) {
+        ed.opts.onChange(ed.lines.join('\n'))
+    }
+}
+
+/**
+ * Rebuild the row to line map from the folds and render the view.
+ * @param {object} ed The editor.
+ */
+function updateRows(ed) {
+    let rows = []
+    for (let i = 0; i < ed.lines.length; i++) {
+        rows.push(i)
+        if (ed.folded.has(i) && ed.foldByStart.has(i)) {
+            i = ed.foldByStart.get(i)[1]
+        }
+    }
+    ed.rows = rows
+    ed.spacer.style.height = `${rows.length * LINE_HEIGHT}px`
+    render(ed)
+}
+
+/**
+ * Render the view on the next animation frame.
+ * @param {object} ed The editor.
+ */
+function scheduleRender(ed) {
+    if (!ed.frame) {
+        ed.frame = requestAnimationFrame(() => {
+            ed.frame = null
+            render(ed)
+        })
+    }
+}
+
+/**
+ * Render the visible lines.
+ * @param {object} ed The editor.
+ */
+function render(ed) {
+    let count = Math.ceil(ed.view.clientHeight / LINE_HEIGHT) + 1
+    let first = Math.min(Math.floor(ed.view.scrollTop / LINE_HEIGHT), Math.max(0, ed.rows.length - count + 1))
+    let last = Math.min(ed.rows.length, first + count)
+    let width = String(ed.lines.length).length
+    ed.window.style.top = `${first * LINE_HEIGHT}px`
+    ed.window.xRemoveChildren()
+    if (ed.lines.length === 1 && ed.lines[0] === '' && ed.opts.placeholder) {
+        ed.window.xAppendChild(
+            xmake('div')
+                .xStyle({opacity: '0.5', cursor: 'text'})
+                .xInnerHTML(ed.opts.placeholder)
+                .xAddEventListener('click', () => startEdit(ed, 0)))
+        return
+    }
+    for (let row = first; row < last; row++) {
+        ed.window.xAppendChild(makeLine(ed, ed.rows[row], width))
+    }
+}
+
+/**
+ * Make the element for one line.
+ * @param {object} ed The editor.
+ * @param {number} n The line number.
+ * @param {number} width The width of the line numbers.
+ * @returns {element} The line element.
+ */
+function makeLine(ed, n, width) {
+    let fold = ed.foldByStart.get(n)
+    let folded = ed.folded.has(n)
+    let marker = fold ? (folded ? '▸' : '▾') : ' '
+    let text = ed.lines[n]
+    if (folded) {
+        let rid = fold[2] === null ? '' : ` ${fold[2]}`
+        text = `${text.trimEnd()} …${rid} (${fold[1] - fold[0] + 1} lines)`
+    } else if (text.length > MAX_LINE_CHARS) {
+        text = text.slice(0, MAX_LINE_CHARS) + '…'
+    }
+    let line = xmake('div').xStyle({height: `${LINE_HEIGHT}px`, overflow: 'hidden'})
+    let gutter = xmake('span')
+        .xStyle({opacity: '0.5', cursor: fold ? 'pointer' : 'default', userSelect: 'none'})
+    gutter.textContent = `${String(n + 1).padStart(width)} ${marker} `
+    if (fold) {
+        gutter.addEventListener('click', () => toggleFold(ed, n))
+    }
+    let content = xmake('span').xStyle({cursor: 'text'})
+    content.textContent = text
+    content.addEventListener('click', () => startEdit(ed, n))
+    if (ed.error && ed.error.line === n) {
+        content.xStyle({textDecoration: 'underline wavy red'})
+        content.title = describeError(ed.error)
+    }
+    if (ed.highlight === n) {
+        line.xStyle({outline: '1px dashed'})
+    }
+    return line.xAppendChild(gutter, content)
+}
+
+/**
+ * Fold or unfold a record.
+ * @param {object} ed The editor.
+ * @param {number} start The start line of the record.
+ */
+function toggleFold(ed, start) {
+    commitEdit(ed)
+    if (ed.folded.has(start)) {
+        ed.folded.delete(start)
+    } else {
+        ed.folded.add(start)
+    }
+    updateRows(ed)
+}
+
+/**
+ * Fold or unfold all records.
+ * @param {object} ed The editor.
+ * @param {boolean} fold Fold the records if true, otherwise unfold them.
+ */
+function foldAll(ed, fold) {
+    commitEdit(ed)
+    ed.folded = new Set(fold ? ed.folds.map((f) => f[0]) : [])
+    updateRows(ed)
+}
+
+/**
+ * Scroll to a line, unfolding the record that hides it.
+ * @param {object} ed The editor.
+ * @param {number} n The line number.
+ */
+function jumpToLine(ed, n) {
+    for (const start of ed.folded) {
+        if (start < n && n <= ed.foldByStart.get(start)[1]) {
+            ed.folded.delete(start)
+        }
+    }
+    ed.highlight = n
+    updateRows(ed)
+    let row = ed.rows.indexOf(n)
+    ed.view.scrollTop = Math.max(0, row - 1) * LINE_HEIGHT
+    render(ed)
+}
+
+/**
+ * Scroll to a record by its <code>__id__</code>.
+ * <p>
+ * An exact match is preferred, otherwise the first record that
+ * contains the text, ignoring case, is used.
+ * @param {object} ed The editor.
+ * @param {string} rid The record id.
+ */
+function jumpToRecord(ed, rid) {
+    let lower = rid.toLowerCase()
+    let fold = ed.folds.find((f) => f[2] === rid) ||
+        ed.folds.find((f) => f[2] !== null && f[2].toLowerCase().includes(lower))
+    if (!fold) {
+        statusMsg(`no record found: ${rid}`)
+        return
+    }
+    ed.folded.delete(fold[0])
+    jumpToLine(ed, fold[0])
+}
+
+/**
+ * Start editing a line.
+ * <p>
+ * If the line is the start of a folded record, the whole record is
+ * edited.
+ * @param {object} ed The editor.
+ * @param {number} n The line number.
+ * @param {number} col The initial cursor position, the default is the
+ * end of the text.
+ */
+function startEdit(ed, n, col) {
+    if (ed.busy) {
+        return
+    }
+    commitEdit(ed)
+    let count = 1
+    if (ed.folded.has(n) && ed.foldByStart.has(n)) {
+        count = ed.foldByStart.get(n)[1] - n + 1
+    }
+    let row = ed.rows.indexOf(n)
+    if (row < 0) {
+        return // hidden by a folded record
+    }
+    let input = xmake('textarea')
+        .xStyle({
+            position: 'absolute',
+            left: '0',
+            top: `${row * LINE_HEIGHT}px`,
+            width: '100%',
+            boxSizing: 'border-box',
+            font: 'inherit',
+            lineHeight: `${LINE_HEIGHT}px`,
+            padding: '0',
+            border: '1px solid',
+            resize: 'none',
+            zIndex: '1',
+            backgroundColor: common.themes._activeColors().bgColor,
+            color: common.themes._activeColors().fgColor,
+        })
+        .xAttr('rows', '1')
+        .xAddEventListener('keydown', (e) => {
+            if (e.key === 'Enter' && !e.shiftKey) {
+                e.preventDefault()
+                commitEdit(ed)
+            } else if (e.key === 'Escape') {
+                cancelEdit(ed)
+            } else if (e.key === 'Backspace' && input.selectionEnd === 0 && n > 0) {
+                e.preventDefault()
+                joinLine(ed)
+            } else if (e.key.toLowerCase() === 'k' && e.shiftKey && (e.ctrlKey || e.metaKey)) {
+                e.preventDefault()
+                deleteLine(ed)
+            }
+        })
+        .xAddEventListener('input', () => {
+            input.rows = input.value.split('\n').length
+        })
+        .xAddEventListener('blur', () => commitEdit(ed))
+    input.value = ed.lines.slice(n, n + count).join('\n')
+    input.rows = count
+    ed.editing = {line: n, count: count, input: input}
+    ed.view.appendChild(input)
+    input.focus()
+    if (col !== undefined) {
+        input.setSelectionRange(col, col)
+    }
+}
+
+/**
+ * Join the line that is being edited to the previous line and edit
+ * the joined line.
+ * @param {object} ed The editor.
+ */
+function joinLine(ed) {
+    let editing = ed.editing
+    let n = editing.line - 1
+    cancelEdit(ed)
+    // Unfold the record that hides the previous line and the edited record.
+    for (const start of ed.folded) {
+        if (start <= n && n <= ed.foldByStart.get(start)[1]) {
+            ed.folded.delete(start)
+        }
+    }
+    ed.folded.delete(editing.line)
+    let col = ed.lines[n].length
+    let insert = (ed.lines[n] + editing.input.value).split('\n')
+    editLines(ed, n, editing.count + 1, insert)
+    startEdit(ed, n, col)
+}
+
+/**
+ * Delete the line or the folded record that is being edited and edit
+ * the line that replaces it.
+ * @param {object} ed The editor.
+ */
+function deleteLine(ed) {
+    let editing = ed.editing
+    cancelEdit(ed)
+    ed.folded.delete(editing.line)
+    editLines(ed, editing.line, editing.count, [])
+    startEdit(ed, Math.min(editing.line, ed.lines.length - 1), 0)
+}
+
+/**
+ * Commit the line that is being edited.
+ * @param {object} ed The editor.
+ */
+function commitEdit(ed) {
+    let editing = ed.editing
+    if (!editing) {
+        return
+    }
+    ed.editing = null
+    editing.input.remove()
+    let value = editing.input.value
+    if (value === ed.lines.slice(editing.line, editing.line + editing.count).join('\n')) {
+        return
+    }
+    if (value === '' && editing.count > 1) {
+        // Clearing a folded record deletes it.
+        ed.folded.delete(editing.line)
+        editLines(ed, editing.line, editing.count, [])
+    } else {
+        editLines(ed, editing.line, editing.count, value.split('\n'))
+    }
+}
+
+/**
+ * Stop editing a line without changing it.
+ * @param {object} ed The editor.
+ */
+function cancelEdit(ed) {
+    if (ed.editing) {
+        let input = ed.editing.input
+        ed.editing = null
+        input.remove()
+    }
+}
@@ -0,0 +1,566 @@
+/*jshint worker: true */
+/**
+ * The worker that validates and formats the raw JSON data for the
+ * raw data editor.
+ * <p>
+ * The document is kept as an array of lines. JSON strings, numbers
+ * and literals cannot span lines so every line starts between tokens
+ * and the complete parser state at the start of each line is small:
+ * what is expected next and the stack of open containers. That state
+ * is saved for every line. When lines are changed, the document is
+ * re-parsed from the first changed line until the state at the start
+ * of an unchanged line is the same as it was before; everything after
+ * that is known to be unchanged. A single edit inside one record of a
+ * large vault therefore only re-parses that record.
+ * <p>
+ * The parser also records where each element of the top level
+ * <code>records</code> array starts and ends and its <code>__id__</code>
+ * so the editor can fold and find records.
+ * <p>
+ * Formatting is incremental too: once the document has been formatted,
+ * only the records that contain changed lines are formatted again.
+ * <p>
+ * Requests are <code>{id, op, ...}</code>. The operations are:
+ * <ul>
+ *   <li>set {text}: Replace the document.</li>
+ *   <li>edit {start, deleteCount, insert}: Replace the lines from start.</li>
+ *   <li>format {indent}: Format the document, an indent of 0 compresses it.</li>
+ *   <li>status: Report the current state.</li>
+ * </ul>
+ * The reply is <code>{id, lines, length, error, folds, splices}</code>
+ * where the error is null or <code>{line, col, message}</code> (zero
+ * based), the folds are <code>[start, end, __id__]</code> triples and
+ * the splices are the <code>{start, deleteCount, insert}</code> line
+ * changes made by a format operation, they must be applied in order.
+ * @module rawedit_worker
+ */
+
+/**
+ * The document lines.
+ */
+var lines = ['']
+
+/**
+ * The encoded parser state at the start of each line, one extra for
+ * the end of the document. It is null for lines after an error
+ * because they were not parsed.
+ */
+var states = [null, null]
+
+/**
+ * The record events found on each line, null if there are none:
+ * ['s'] for a record start, ['e'] for a record end and ['i', __id__].
+ */
+var events = [null]
+
+/**
+ * The lines that changed since the last format.
+ */
+var dirty = [false]
+
+/**
+ * True if the document was completely formatted by the last format
+ * operation with the indent in <code>formatIndent</code>.
+ */
+var formatted = false
+
+/**
+ * The indent of the last format operation.
+ */
+var formatIndent = 0
+
+/**
+ * The document length in characters.
+ */
+var length = 0
+
+/**
+ * The first error: {line, col, message} or null.
+ */
+var error = null
+
+/**
+ * The number pattern, it must be matched at a specific position.
+ */
+const NUMBER = /-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?/y
+
+/**
+ * The valid string escape characters.
+ */
+const ESCAPES = '"\\/bfnrtu'
+
+/**
+ * The descriptions of the parser expectations used for error messages.
+ */
+const EXPECTED = {
+    value: 'a value',
+    first: 'a value or "]"',
+    key: 'a key or "}"',
+    next: 'a key',
+    colon: '":"',
+    comma: '"," or the end of the container',
+    end: 'the end of the data',
+}
+
+/**
+ * Create the parser state for the start of the document.
+ * <p>
+ * The state is: expect, what is expected next; stack, the open
+ * containers as a string of "{" and "["; records, true if the last
+ * top level key was "records"; id, true if the last key of a record
+ * was "__id__".
+ * @returns {object} The state.
+ */
+function initialState() {
+    return {expect: 'value', stack: '', records: false, id: false}
+}
+
+/**
+ * Encode a parser state so that it can be stored and compared.
+ * @param {object} st The state.
+ * @returns {string} The encoded state.
+ */
+function encodeState(st) {
+    return `${st.expect}:${st.records ? 1 : 0}${st.id ? 1 : 0}:${st.stack}`
+}
+
+/**
+ * Decode a parser state.
+ * @param {string} text The encoded state.
+ * @returns {object} The state.
+ */
+function decodeState(text) {
+    let i = text.indexOf(':')
+    return {
+        expect: text.slice(0, i),
+        records: text[i + 1] === '1',
+        id: text[i + 2] === '1',
+        stack: text.slice(i + 4),
+    }
+}
+
+/**
+ * Describe a character for an error message.
+ * @param {string} ch The character.
+ * @returns {string} The description.
+ */
+function describe(ch) {
+    if (ch < ' ') {
+        return `control character U+${ch.charCodeAt(0).toString(16).padStart(4, '0')}`
+    }
+    return `"${ch}"`
+}
+
+/**
+ * Update the state after a complete value.
+ * @param {object} st The state.
+ */
+function afterValue(st) {
+    st.id = false
+    st.expect = st.stack.length ? 'comma' : 'end'
+}
+
+/**
+ * Parse a string token.
+ * @param {string} text The line.
+ * @param {number} start The position of the opening quote.
+ * @returns {object} {end, error} where end is the position after the
+ * closing quote and error is the error message or null.
+ */
+function parseString(text, start) {
+    let i = start + 1
+    while (i < text.length) {
+        let ch = text[i]
+        if (ch === '"') {
+            return {end: i + 1, error: null}
+        }
+        if (ch < ' ') {
+            return {end: i, error: `unexpected ${describe(ch)} in string`}
+        }
+        if (ch === '\\') {
+            let esc = text[i + 1]
+            if (esc === undefined || !ESCAPES.includes(esc)) {
+                return {end: i, error: 'invalid escape sequence in string'}
+            }
+            if (esc === 'u' && !/^[0-9a-fA-F]{4}$/.test(text.slice(i + 2, i + 6))) {
+                return {end: i, error: 'invalid unicode escape sequence in string'}
+            }
+            i += esc === 'u' ? 6 : 2
+            continue
+        }
+        i++
+    }
+    return {end: start, error: 'unterminated string'}
+}
+
+/**
+ * Parse one line.
+ * <p>
+ * The state is updated in place and the record events for the line
+ * are stored in <code>events</code>.
+ * @param {number} n The line number.
+ * @param {object} st The state at the start of the line.
+ * @returns {object} The error or null.
+ */
+function parseLine(n, st) {
+    let text = lines[n]
+    let found = null
+    let event = (...args) => {
+        found = found || []
+        found.push(args)
+    }
+    let fail = (col, message) => {
+        events[n] = found
+        return {line: n, col: col, message: message}
+    }
+    let i = 0
+    while (i < text.length) {
+        let ch = text[i]
+        if (ch === ' ' || ch === '\t' || ch === '\r') {
+            i++
+            continue
+        }
+        let top = st.stack[st.stack.length - 1]
+        let isValue = st.expect === 'value' || st.expect === 'first'
+        let isKey = st.expect === 'key' || st.expect === 'next'
+        if (ch === '{' && isValue) {
+            st.stack += '{'
+            st.expect = 'key'
+            if (st.records && st.stack === '{[{') {
+                event('s')
+            }
+            i++
+        } else if (ch === '[' && isValue) {
+            st.stack += '['
+            st.expect = 'first'
+            i++
+        } else if (ch === '}' && top === '{' && (st.expect === 'key' || st.expect === 'comma')) {
+            st.stack = st.stack.slice(0, -1)
+            if (st.records && st.stack === '{[') {
+                event('e')
+            }
+            afterValue(st)
+            i++
+        } else if (ch === ']' && top === '[' && (st.expect === 'first' || st.expect === 'comma')) {
+            st.stack = st.stack.slice(0, -1)
+            afterValue(st)
+            i++
+        } else if (ch === ',' && st.expect === 'comma') {
+            st.expect = top === '{' ? 'next' : 'value'
+            i++
+        } else if (ch === ':' && st.expect === 'colon') {
+            st.expect = 'value'
+            i++
+        } else if (ch === '"' && (isKey || isValue)) {
+            let result = parseString(text, i)
+            if (result.error) {
+                return fail(result.end, result.error)
+            }
+            if (isKey) {
+                let key = null
+                if (st.stack.length === 1 || (st.records && st.stack === '{[{')) {
+                    key = JSON.parse(text.slice(i, result.end))
+                }
+                if (st.stack.length === 1) {
+                    st.records = key === 'records'
+                }
+                st.id = key === '__id__'
+                st.expect = 'colon'
+            } else {
+                if (st.id && st.records && st.stack === '{[{') {
+                    event('i', JSON.parse(text.slice(i, result.end)))
+                }
+                afterValue(st)
+            }
+            i = result.end
+        } else if (isValue && (ch === '-' || (ch >= '0' && ch <= '9'))) {
+            NUMBER.lastIndex = i
+            let m = NUMBER.exec(text)
+            if (!m) {
+                return fail(i, 'invalid number')
+            }
+            afterValue(st)
+            i += m[0].length
+        } else if (isValue && (text.startsWith('true', i) || text.startsWith('null', i))) {
+            afterValue(st)
+            i += 4
+        } else if (isValue && text.startsWith('false', i)) {
+            afterValue(st)
+            i += 5
+        } else {
+            return fail(i, `unexpected ${describe(ch)}, expected ${EXPECTED[st.expect]}`)
+        }
+    }
+    events[n] = found
+    return null
+}
+
+/**
+ * Check the state at the end of the document.
+ * @param {object} st The state.
+ * @returns {object} The error or null.
+ */
+function checkEnd(st) {
+    if (st.expect === 'end' || (st.expect === 'value' && st.stack === '')) {
+        return null  // complete or empty
+    }
+    let n = lines.length - 1
+    return {line: n, col: lines[n].length, end: true, message: `unexpected end of data, expected ${EXPECTED[st.expect]}`}
+}
+
+/**
+ * Parse the document from a line until the state converges with the
+ * state from the previous parse.
+ * @param {number} from The first line to parse.
+ * @param {string} start The encoded state at the start of the line.
+ * @param {number} changed The first line after the changed lines,
+ * the states can only converge from there.
+ */
+function parse(from, start, changed) {
+    let previous = error
+    error = null
+    let st = decodeState(start)
+    for (let i = from; i <= lines.length; i++) {
+        let state = encodeState(st)
+        if (i >= changed && states[i] === state) {
+            // Everything from here on is unchanged, including the error.
+            if (previous && previous.end) {
+                error = checkEnd(decodeState(states[lines.length]))
+            } else if (previous && previous.line >= i) {
+                error = previous
+            }
+            return
+        }
+        states[i] = state
+        let err = i < lines.length ? parseLine(i, st) : checkEnd(st)
+        if (err) {
+            error = err
+            for (let j = i + 1; j <= lines.length; j++) {
+                states[j] = null
+                if (j < lines.length) {
+                    events[j] = null
+                }
+            }
+            return
+        }
+    }
+}
+
+/**
+ * Replace array elements.
+ * <p>
+ * Small changes are made in place, large ones build a new array
+ * because splice() cannot take a very large number of arguments.
+ * @param {Array} array The array.
+ * @param {number} start The first element to replace.
+ * @param {number} deleteCount The number of elements to replace.
+ * @param {Array} insert The new elements.
+ * @returns {Array} The changed array.
+ */
+function replace(array, start, deleteCount, insert) {
+    if (insert.length < 1000) {
+        array.splice(start, deleteCount, ...insert)
+        return array
+    }
+    return array.slice(0, start).concat(insert, array.slice(start + deleteCount))
+}
+
+/**
+ * Replace lines in the document and re-parse what changed.
+ * @param {number} start The first line to replace.
+ * @param {number} deleteCount The number of lines to replace.
+ * @param {string[]} insert The new lines.
+ */
+function splice(start, deleteCount, insert) {
+    let k = insert.length
+    let removed = lines.slice(start, start + deleteCount)
+    length += insert.reduce((t, x) => t + x.length, 0) + k
+    length -= removed.reduce((t, x) => t + x.length, 0) + deleteCount
+    let before = states[start]
+    let none = new Array(k).fill(null)
+    lines = replace(lines, start, deleteCount, insert)
+    states = replace(states, start, deleteCount, none)
+    events = replace(events, start, deleteCount, none)
+    dirty = replace(dirty, start, deleteCount, new Array(k).fill(true))
+    if (error) {
+        if (error.line >= start + deleteCount) {
+            error.line += k - deleteCount
+        } else if (error.line >= start) {
+            error.line = start  // the error line was replaced
+        }
+    }
+    if (lines.length === 0) {
+        lines = ['']
+        states = [null, null]
+        events = [null]
+        dirty = [true]
+        length = 0
+        k = 1
+    }
+    if (before === null) {
+        return  // there is an error before the change
+    }
+    parse(start, before, start + k)
+}
+
+/**
+ * Replace the document.
+ * @param {string} text The new document.
+ */
+function setText(text) {
+    lines = text.split('\n')
+    states = new Array(lines.length + 1).fill(null)
+    events = new Array(lines.length).fill(null)
+    dirty = new Array(lines.length).fill(false)
+    length = text.length
+    formatted = false
+    error = null
+    parse(0, encodeState(initialState()), 0)
+}
+
+/**
+ * Find the records from the line events.
+ * @returns {Array} The [start, end, __id__] triples.
+ */
+function getFolds() {
+    let folds = []
+    let open = null
+    for (let i = 0; i < events.length; i++) {
+        if (!events[i]) {
+            continue
+        }
+        for (const ev of events[i]) {
+            if (ev[0] === 's') {
+                open = [i, i, null]
+            } else if (ev[0] === 'i' && open) {
+                open[2] = ev[1]
+            } else if (ev[0] === 'e' && open) {
+                open[1] = i
+                folds.push(open)
+                open = null
+            }
+        }
+    }
+    return folds
+}
+
+/**
+ * Format one record in place.
+ * <p>
+ * The record must start and end on lines of its own.
+ * @param {Array} fold The record [start, end, __id__].
+ * @param {number} indent The indent.
+ * @returns {object} The splice or null if the record cannot be formatted by itself.
+ */
+function formatRecord(fold, indent) {
+    let [start, end] = fold
+    let first = lines[start].trim()
+    let last = lines[end].trim()
+    if (!first.startsWith('{') || (last !== '}' && last !== '},')) {
+        return null
+    }
+    let prefix = lines[start].match(/^\s*/)[0]
+    let text = lines.slice(start, end + 1).join('\n').trim()
+    let comma = text.endsWith(',')
+    let rec = JSON.parse(comma ? text.slice(0, -1) : text)
+    let insert = JSON.stringify(rec, null, indent).split('\n').map((x) => prefix + x)
+    if (comma) {
+        insert[insert.length - 1] += ','
+    }
+    return {start: start, deleteCount: end - start + 1, insert: insert}
+}
+
+/**
+ * Format the document.
+ * <p>
+ * If the document was formatted before with the same indent and all of
+ * the changes since then are inside records, only those records are
+ * formatted, otherwise the whole document is formatted.
+ * @param {number} indent The indent, 0 compresses the document.
+ * @returns {object} The splices that were made and the error:
+ * {splices, error}, the document is not changed if there is an error.
+ */
+function format(indent) {
+    if (error) {
+        return {splices: [], error: error}
+    }
+    if (lines.every((line) => line.trim() === '')) {
+        // An empty document is valid while editing but it cannot be formatted.
+        return {splices: [], error: {line: 0, col: 0, message: 'no data'}}
+    }
+    let splices = []
+    if (indent && formatted && formatIndent === indent) {
+        let folds = getFolds()
+        let inside = new Array(lines.length).fill(false)
+        for (const fold of folds) {
+            inside.fill(true, fold[0], fold[1] + 1)
+        }
+        if (dirty.every((d, i) => !d || inside[i])) {
+            // Work backwards so the line numbers of the earlier records do not change.
+            for (let i = folds.length - 1; i >= 0; i--) {
+                let fold = folds[i]
+                if (!dirty.slice(fold[0], fold[1] + 1).includes(true)) {
+                    continue
+                }
+                let change = formatRecord(fold, indent)
+                if (!change) {
+                    splices = null
+                    break
+                }
+                splices.push(change)
+            }
+        } else {
+            splices = null
+        }
+        if (splices) {
+            for (const change of splices) {
+                splice(change.start, change.deleteCount, change.insert)
+            }
+            dirty.fill(false)
+            return {splices: splices, error: null}
+        }
+    }
+    let text = JSON.stringify(JSON.parse(lines.join('\n')), null, indent || undefined)
+    let change = {start: 0, deleteCount: lines.length, insert: text.split('\n')}
+    setText(text)
+    formatted = indent > 0
+    formatIndent = indent
+    return {splices: [change], error: null}
+}
+
+/**
+ * Handle a request.
+ * <p>
+ * A reply is always posted, even if the request fails, so that the
+ * editor never waits for a reply that will not come.
+ */
+self.onmessage = (e) => {
+    let req = e.data
+    let result = {splices: [], error: null}
+    try {
+        if (req.op === 'set') {
+            setText(req.text)
+        } else if (req.op === 'edit') {
+            splice(req.start, req.deleteCount, req.insert)
+        } else if (req.op === 'format') {
+            result = format(req.indent)
+        }
+        self.postMessage({
+            id: req.id,
+            lines: lines.length,
+            length: length,
+            error: result.error || error,
+            folds: getFolds(),
+            splices: result.splices,
+        })
+    } catch (exc) {
+        self.postMessage({
+            id: req.id,
+            lines: lines.length,
+            length: length,
+            error: {line: 0, col: 0, message: `internal error: ${exc}`},
+            folds: [],
+            splices: [],
+        })
+    }
+}
@@ -4,7 +4,7 @@
  * chaining.
  * @module utils
 */
-import { common } from '/js/common.js'
+import { common, getFieldValueType, getFieldTypesVersion } from '/js/common.js'
 import { getColorFilter } from '/js/icons.js'
 import { makeIcon, makeIconWithImg }  from '/js/icons.js'
 
@@ -353,6 +353,67 @@ export function isURL(value) {
     return false
 }
 
+/**
+ * A record view model field.
+ * <p>
+ * The URL check parses the value so it is only done when the url
+ * property is first read, most users of the view model only need the
+ * field value type.
+ */
+class RecordViewField {
+    constructor(key, value, ftype) {
+        this.key = key
+        this.value = value
+        this.ftype = ftype
+        this._url = null
+    }
+
+    get url() {
+        if (this._url === null) {
+            this._url = this.ftype === 'string' && typeof this.value === 'string' && isURL(this.value)
+        }
+        return this._url
+    }
+}
+
+/**
+ * The record view models by record object.
+ */
+var recordViewModels = new WeakMap()
+
+/**
+ * Get the view model of a record.
+ * <p>
+ * The view model has the fields of the record in display order with
+ * their value types so that rendering a record does not classify the
+ * field names or parse the values again. It is cached by record
+ * object. Records are replaced, not modified, when they are edited so
+ * a changed record gets a new view model. All of the view models are
+ * recomputed when the field type preferences change.
+ * @example
+ * let model = getRecordViewModel({__id__: 'x', password: 'secret', url: 'https://x.com'})
+ * assert model.fields[1].ftype == 'password'
+ * assert model.fields[2].url == true
+ * @param {object} rec The record.
+ * @returns {object} The view model: {version, fields} where each field
+ * is {key, value, ftype, url}, ftype is the field value type and url is
+ * true if the value of a string field is a URL, it is computed on
+ * first use.
+ */
+export function getRecordViewModel(rec) {
+    let version = getFieldTypesVersion()
+    let model = recordViewModels.get(rec)
+    if (!model || model.version !== version) {
+        let fields = []
+        for (const key of Object.keys(rec)) {
+            fields.push(new RecordViewField(key, rec[key], getFieldValueType(key)))
+        }
+        model = {version: version, fields: fields}
+        recordViewModels.set(rec, model)
+    }
+    return model
+}
+
 /**
  * Deep copy an object.
  * <p>